@@ -0,0 +1,74 @@
+import threading
+from time import perf_counter
+
+class AudioRingBuffer:
+    # Fixed-size byte ring shared by the PortAudio callback (writer) and the decoder (reader).
+    # When the reader falls behind, the oldest audio is overwritten and counted in dropped_bytes.
+    def __init__(self, capacity, frame_size=2):
+        self.frame_size = frame_size
+        self.capacity = capacity - capacity % frame_size
+        self.buffer = bytearray(self.capacity)
+        self.view = memoryview(self.buffer)
+        self.lock = threading.Lock()
+
+        self.start = 0
+        self.size = 0
+        self.last_write = None
+        self.dropped_bytes = 0
+        self.overflows = 0
+
+    def __len__(self):
+        return self.size
+
+    def write(self, data):
+        src = memoryview(data).cast('B')
+        length = len(src)
+        if not length:
+            return
+
+        with self.lock:
+            if length >= self.capacity:
+                # Larger than the whole ring, only the newest audio survives
+                self.dropped_bytes += self.size + length - self.capacity
+                self.overflows += 1
+                src = src[length - self.capacity:]
+                length = self.capacity
+                self.start = 0
+                self.size = 0
+
+            overflow = self.size + length - self.capacity
+            if overflow > 0:
+                overflow += -overflow % self.frame_size
+                self.start = (self.start + overflow) % self.capacity
+                self.size -= overflow
+                self.dropped_bytes += overflow
+                self.overflows += 1
+
+            end = (self.start + self.size) % self.capacity
+            first = min(length, self.capacity - end)
+            self.view[end:end + first] = src[:first]
+            if first < length:
+                self.view[:length - first] = src[first:]
+
+            self.size += length
+            self.last_write = perf_counter()
+
+    def read(self):
+        # Drains everything buffered in one copy. Returns (arrival of newest audio, bytes)
+        with self.lock:
+            if not self.size:
+                return self.last_write, b''
+
+            first = min(self.size, self.capacity - self.start)
+            data = bytes(self.view[self.start:self.start + first])
+            if first < self.size:
+                data += self.view[:self.size - first]
+
+            self.start = (self.start + self.size) % self.capacity
+            self.size = 0
+            return self.last_write, data
+
+    def clear(self):
+        with self.lock:
+            self.start = 0
+            self.size = 0
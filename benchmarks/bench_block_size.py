@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import wave
+import argparse
+from time import perf_counter, process_time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vosk import Model, KaldiRecognizer, SetLogLevel
+from enums import Phrases
+from voice_recognizer import VOSK_MODEL_PATH, BLOCK_SIZE, SPEECH_BLOCK_SIZE, phrase_values
+
+# Usage: python benchmarks/bench_block_size.py command.wav --phrase-end 2.3
+# The WAV must be 16-bit mono. --phrase-end is where the spoken command ends (seconds into the file)
+
+def find_command(text):
+    return next((value for value in phrase_values(Phrases) if value in text), None)
+
+def run(model, frames, rate, block_size, speech_block_size=None):
+    recognizer = KaldiRecognizer(model, rate)
+    adaptive = speech_block_size is not None
+    step = speech_block_size if adaptive else block_size
+    
+    detected_at = None
+    pending = b''
+    speech_active = False
+    cpu_start = process_time()
+    
+    for offset in range(0, len(frames), step * 2):
+        pending += frames[offset:offset + step * 2]
+        audio_time = (offset + step * 2) / 2 / rate
+        if adaptive and not speech_active and len(pending) < block_size * 2:
+            continue
+        
+        wall_start = perf_counter()
+        if recognizer.AcceptWaveform(pending):
+            text = json.loads(recognizer.Result()).get('text', '')
+            speech_active = False
+        else:
+            text = json.loads(recognizer.PartialResult()).get('partial', '')
+            speech_active = bool(text)
+        pending = b''
+        
+        if detected_at is None and find_command(text):
+            detected_at = audio_time + perf_counter() - wall_start
+    
+    audio_seconds = len(frames) / 2 / rate
+    cpu_ms = (process_time() - cpu_start) * 1000 / audio_seconds
+    return cpu_ms, detected_at
+
+def main():
+    parser = argparse.ArgumentParser(description='CPU cost and detection latency per recognizer block size')
+    parser.add_argument('wav')
+    parser.add_argument('--phrase-end', type=float, default=None)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[800, SPEECH_BLOCK_SIZE, 4000, BLOCK_SIZE])
+    args = parser.parse_args()
+    
+    SetLogLevel(-1)
+    model = Model(VOSK_MODEL_PATH)
+    with wave.open(args.wav, 'rb') as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            sys.exit('Expected a 16-bit mono WAV file')
+        rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    
+    settings = [(f'{size} frames', size, None) for size in args.sizes]
+    settings.append((f'adaptive {SPEECH_BLOCK_SIZE}/{BLOCK_SIZE}', BLOCK_SIZE, SPEECH_BLOCK_SIZE))
+    
+    print(f'{"setting":<24}{"cpu ms/audio s":>16}{"latency ms":>14}')
+    for name, block_size, speech_block_size in settings:
+        cpu_ms, detected_at = run(model, frames, rate, block_size, speech_block_size)
+        if detected_at is None:
+            latency = 'missed'
+        elif args.phrase_end is None:
+            latency = f'@{detected_at:.2f}s'
+        else:
+            latency = f'{(detected_at - args.phrase_end) * 1000:.0f}'
+        print(f'{name:<24}{cpu_ms:>16.1f}{latency:>14}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import os
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phrase_matcher import PhraseMatcher
+
+# Usage: python benchmarks/bench_phrase_matcher.py
+# Compares the token trie with the old substring scan as the command catalogue grows
+
+WORDS = ['scene', 'camera', 'mute', 'unmute', 'mic', 'desktop', 'overlay', 'intro', 'outro', 'game',
+         'chat', 'brb', 'ending', 'starting', 'music', 'volume', 'up', 'down', 'switch', 'show', 'hide']
+TRANSCRIPT = 'okay chat that was close freya switch scene camera and then freya clip that please'
+
+def make_catalogue(size, rng):
+    phrases = set()
+    while len(phrases) < size:
+        phrases.add('freya ' + ' '.join(rng.sample(WORDS, rng.randint(1, 3))))
+    return sorted(phrases)
+
+def substring_scan(phrases, text):
+    return [phrase for phrase in phrases if phrase in text]
+
+def main():
+    rng = random.Random(0)
+    runs = 2000
+    print(f'{"phrases":>8}{"substring us":>15}{"trie us":>10}')
+    for size in [10, 100, 1000, 5000]:
+        phrases = make_catalogue(size, rng)
+        matcher = PhraseMatcher((phrase, phrase) for phrase in phrases)
+        
+        scan = timeit.timeit(lambda: substring_scan(phrases, TRANSCRIPT), number=runs) / runs * 1e6
+        trie = timeit.timeit(lambda: matcher.find(TRANSCRIPT), number=runs) / runs * 1e6
+        print(f'{size:>8}{scan:>15.2f}{trie:>10.2f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import asyncio
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vosk import SetLogLevel
+from voice_recognizer import VoskVoiceRecognizer, VOSK_MODEL_PATH
+from replay_harness import FakeOBSController, read_wav, replay
+from yaml_config import DEFAULT_CONFIG
+
+# Usage: python benchmarks/bench_recognition.py corpus.json [--realtime] [--max-rtf 0.5] [--min-hit-rate 0.9]
+# corpus.json lists 16-bit mono WAVs (paths relative to it) with the phrases spoken in each:
+#   [{"file": "clip.wav", "phrases": ["freya clip it"], "phrase_end": 2.3}, {"file": "chatter.wav", "phrases": []}]
+# phrase_end is optional and is where the first phrase ends, in seconds. Exits non-zero when a threshold fails
+
+def make_recognizer(config, model_path):
+    recognizer = VoskVoiceRecognizer(FakeOBSController(), config)
+    recognizer.model_path = model_path
+    return recognizer
+
+async def expected_actions(phrases, config):
+    # Whatever the recognizer does with the transcript is the right answer for the audio
+    recognizer = VoskVoiceRecognizer(FakeOBSController(), {**config, 'command_cooldown_ms': 0})
+    for phrase in phrases:
+        await recognizer.phrase_handler(phrase.lower())
+    return [action for action, _ in recognizer.obs_controller.actions]
+
+async def run_entry(entry, base, config, model_path, realtime):
+    recognizer = make_recognizer(config, model_path)
+    frames = read_wav(os.path.join(base, entry['file']), recognizer.sample_rate)
+    result = await replay(recognizer, frames, realtime=realtime)
+    recognizer.executor.shutdown()
+
+    expected = Counter(await expected_actions(entry.get('phrases', []), config))
+    fired = recognizer.obs_controller.actions
+    fired_counts = Counter(action for action, _ in fired)
+
+    latency = None
+    if entry.get('phrase_end') is not None and expected:
+        first = next((position for action, position in fired if action in expected), None)
+        if first is not None:
+            latency = (first - entry['phrase_end']) * 1000
+
+    return {
+        'file': entry['file'],
+        'audio_seconds': result.audio_seconds,
+        'wall_seconds': result.wall_seconds,
+        'cpu_seconds': result.cpu_seconds,
+        'hits': sum((expected & fired_counts).values()),
+        'misses': sum((expected - fired_counts).values()),
+        'false_positives': sum((fired_counts - expected).values()),
+        'latency_ms': latency,
+    }
+
+def summarize(rows):
+    audio = sum(row['audio_seconds'] for row in rows)
+    expected = sum(row['hits'] + row['misses'] for row in rows)
+    latencies = sorted(row['latency_ms'] for row in rows if row['latency_ms'] is not None)
+    return {
+        'files': len(rows),
+        'audio_seconds': audio,
+        'real_time_factor': sum(row['wall_seconds'] for row in rows) / audio,
+        'cpu_seconds_per_audio_hour': sum(row['cpu_seconds'] for row in rows) / audio * 3600,
+        'hit_rate': sum(row['hits'] for row in rows) / expected if expected else None,
+        'false_positives': sum(row['false_positives'] for row in rows),
+        'median_latency_ms': latencies[len(latencies) // 2] if latencies else None,
+        'max_latency_ms': latencies[-1] if latencies else None,
+    }
+
+def format_optional(value, spec):
+    return '-' if value is None else format(value, spec)
+
+async def run(args, config):
+    with open(args.corpus) as file:
+        corpus = json.load(file)
+    base = os.path.dirname(os.path.abspath(args.corpus))
+    return [await run_entry(entry, base, config, args.model, args.realtime) for entry in corpus]
+
+def main():
+    parser = argparse.ArgumentParser(description='Replays a labelled WAV corpus through the recognizer')
+    parser.add_argument('corpus')
+    parser.add_argument('--model', default=VOSK_MODEL_PATH)
+    parser.add_argument('--realtime', action='store_true', help='pace audio like a live microphone')
+    parser.add_argument('--decoding', choices=['Open', 'Grammar'], default=DEFAULT_CONFIG['decoding'])
+    parser.add_argument('--partial-results', action='store_true')
+    parser.add_argument('--adaptive-blocks', action='store_true')
+    parser.add_argument('--vad', action='store_true')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    parser.add_argument('--max-rtf', type=float)
+    parser.add_argument('--min-hit-rate', type=float)
+    parser.add_argument('--max-false-positives', type=int)
+    args = parser.parse_args()
+
+    config = {
+        **DEFAULT_CONFIG,
+        'decoding': args.decoding,
+        'partial_results': args.partial_results,
+        'adaptive_blocks': args.adaptive_blocks,
+        'vad': args.vad,
+    }
+    SetLogLevel(-1)
+    rows = asyncio.run(run(args, config))
+    summary = summarize(rows)
+
+    if args.json:
+        print(json.dumps({'files': rows, 'summary': summary}, indent=2))
+    else:
+        print(f'{"file":<32}{"audio s":>9}{"rtf":>7}{"hits":>6}{"miss":>6}{"false":>7}{"latency ms":>12}')
+        for row in rows:
+            rtf = row['wall_seconds'] / row['audio_seconds']
+            print(f'{row["file"]:<32}{row["audio_seconds"]:>9.1f}{rtf:>7.3f}{row["hits"]:>6}{row["misses"]:>6}'
+                  f'{row["false_positives"]:>7}{format_optional(row["latency_ms"], ".0f"):>12}')
+        print()
+        print(f'Real-time factor:     {summary["real_time_factor"]:.3f}')
+        print(f'CPU per audio hour:   {summary["cpu_seconds_per_audio_hour"]:.0f} s')
+        print(f'Hit rate:             {format_optional(summary["hit_rate"], ".1%")}')
+        print(f'False positives:      {summary["false_positives"]}')
+        print(f'Median latency:       {format_optional(summary["median_latency_ms"], ".0f")} ms')
+
+    failures = []
+    if args.max_rtf is not None and summary['real_time_factor'] > args.max_rtf:
+        failures.append(f'real-time factor {summary["real_time_factor"]:.3f} above {args.max_rtf}')
+    if args.min_hit_rate is not None and (summary['hit_rate'] or 0) < args.min_hit_rate:
+        failures.append(f'hit rate {format_optional(summary["hit_rate"], ".1%")} below {args.min_hit_rate:.1%}')
+    if args.max_false_positives is not None and summary['false_positives'] > args.max_false_positives:
+        failures.append(f'{summary["false_positives"]} false positives, at most {args.max_false_positives} allowed')
+    if failures:
+        sys.exit('Benchmark failed: ' + '; '.join(failures))
+
+if __name__ == '__main__':
+    main()
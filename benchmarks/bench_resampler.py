@@ -0,0 +1,56 @@
+import os
+import sys
+import argparse
+from time import process_time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resampler import StreamResampler
+
+# Usage: python benchmarks/bench_resampler.py [--seconds 60] [--max-cpu-ms 20]
+# Feeds noise through the resampler in device-sized blocks and reports the CPU it costs per second of audio,
+# plus the delay it adds on top of the block the device already buffers. Exits non-zero above --max-cpu-ms
+
+OUT_RATE = 16000
+RATES = (44100, 48000)
+CHANNELS = (1, 2)
+BLOCK_MS = (100, 500)
+
+def measure(rate, channels, block_ms, seconds):
+    resampler = StreamResampler(rate, OUT_RATE, channels)
+    frames = rate * block_ms // 1000
+    block = np.random.default_rng(0).integers(-8000, 8000, frames * channels, dtype=np.int16).tobytes()
+    blocks = max(1, seconds * 1000 // block_ms)
+
+    started = process_time()
+    for _ in range(blocks):
+        resampler.process(block)
+    cpu = process_time() - started
+    return {
+        'cpu_ms_per_second': cpu * 1000 / (blocks * block_ms / 1000),
+        'filter_delay_ms': resampler.delay / rate * 1000,
+        'block_ms': block_ms,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the capture resampler')
+    parser.add_argument('--seconds', type=int, default=60, help='audio seconds per configuration')
+    parser.add_argument('--max-cpu-ms', type=float)
+    args = parser.parse_args()
+
+    print(f'{"rate":>7}{"ch":>4}{"block ms":>10}{"cpu ms/s":>10}{"delay ms":>10}')
+    worst = 0
+    for rate in RATES:
+        for channels in CHANNELS:
+            for block_ms in BLOCK_MS:
+                row = measure(rate, channels, block_ms, args.seconds)
+                worst = max(worst, row['cpu_ms_per_second'])
+                print(f'{rate:>7}{channels:>4}{block_ms:>10}{row["cpu_ms_per_second"]:>10.2f}{row["filter_delay_ms"]:>10.2f}')
+
+    if args.max_cpu_ms is not None and worst > args.max_cpu_ms:
+        sys.exit(f'Benchmark failed: {worst:.2f} ms of CPU per audio second, at most {args.max_cpu_ms} allowed')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+import json
+import logging
+import threading
+import multiprocessing
+from time import monotonic
+from multiprocessing import shared_memory
+
+# Model loading in a fresh process takes as long as it does in the app
+STARTUP_TIMEOUT = 120
+DECODE_TIMEOUT = 10
+# Backoff between relaunch attempts when a replacement process won't start. Audio is dropped meanwhile
+RELAUNCH_BASE_DELAY = 1
+RELAUNCH_MAX_DELAY = 60
+EMPTY_PARTIAL = json.dumps({'partial': ''})
+EMPTY_RESULT = json.dumps({'text': ''})
+
+def worker_main(conn, shm_name, model_path, sample_rate, grammar):
+    # Runs in the decoder process. Audio arrives in shared memory, only the lengths and JSON results cross the pipe
+    import vosk
+    vosk.SetLogLevel(-1)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        model = vosk.Model(model_path)
+        if grammar:
+            recognizer = vosk.KaldiRecognizer(model, sample_rate, grammar)
+        else:
+            recognizer = vosk.KaldiRecognizer(model, sample_rate)
+    except Exception as e:
+        conn.send(('error', str(e)))
+        shm.close()
+        return
+    conn.send(('ready', None))
+
+    while True:
+        try:
+            command, arg = conn.recv()
+        except EOFError:
+            break
+        if command == 'accept':
+            if recognizer.AcceptWaveform(bytes(shm.buf[:arg])):
+                conn.send((True, recognizer.Result()))
+            else:
+                conn.send((False, recognizer.PartialResult()))
+        elif command == 'final':
+            conn.send((True, recognizer.FinalResult()))
+        elif command == 'grammar':
+            recognizer.SetGrammar(arg)
+            conn.send((True, None))
+        elif command == 'close':
+            break
+    shm.close()
+
+class ProcessDecoder:
+    # Drop-in for KaldiRecognizer that decodes in a child process, so Vosk never holds this process's GIL.
+    # If the child dies or hangs it is replaced and the block in flight is dropped
+    def __init__(self, model_path, sample_rate, grammar=None, capacity=320000, target=worker_main):
+        self.logger = logging.getLogger(__name__)
+        self.model_path = model_path
+        self.sample_rate = sample_rate
+        self.grammar = grammar
+        self.capacity = capacity
+        self.target = target
+        self.context = multiprocessing.get_context('spawn')
+        self.shm = shared_memory.SharedMemory(create=True, size=capacity)
+        self.lock = threading.Lock()
+        self.last_result = EMPTY_RESULT
+        self.last_partial = EMPTY_PARTIAL
+        self.restarts = 0
+        self.failed_launches = 0
+        self.retry_at = None
+        self.process = None
+        self.conn = None
+        self.closed = False
+        try:
+            self.launch()
+        except Exception:
+            self.release_memory()
+            raise
+
+    def launch(self):
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=self.target,
+            args=(child_conn, self.shm.name, self.model_path, self.sample_rate, self.grammar),
+            name='vosk-decoder-process',
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+
+        if not self.conn.poll(STARTUP_TIMEOUT):
+            self.kill()
+            raise TimeoutError('Decoder process did not start in time')
+        status, message = self.conn.recv()
+        if status != 'ready':
+            self.kill()
+            raise Exception(f'Decoder process failed to load the model: {message}')
+        self.logger.info(f'Decoder process {self.process.pid} ready')
+
+    def kill(self):
+        if self.process and self.process.is_alive():
+            self.process.kill()
+        if self.process:
+            self.process.join(timeout=5)
+        if self.conn:
+            self.conn.close()
+
+    def restart(self, reason):
+        self.restarts += 1
+        self.logger.warning(f'Decoder process {self.process.pid} {reason}. Restarting it (restart {self.restarts})')
+        self.kill()
+        return self.relaunch()
+
+    def relaunch(self):
+        # Never raises. A replacement that won't start is retried with backoff by later requests
+        try:
+            self.launch()
+        except Exception as e:
+            delay = min(RELAUNCH_MAX_DELAY, RELAUNCH_BASE_DELAY * 2 ** self.failed_launches)
+            self.failed_launches += 1
+            self.retry_at = monotonic() + delay
+            self.logger.error(f'Decoder process could not be restarted: {e}. Retrying in {delay:.0f}s')
+            return False
+        self.failed_launches = 0
+        self.retry_at = None
+        return True
+
+    def request(self, command, arg, fallback, data=None):
+        with self.lock:
+            if self.closed:
+                return fallback
+            if self.retry_at is not None and (monotonic() < self.retry_at or not self.relaunch()):
+                return fallback
+            # Written under the lock so close() can't release the segment mid-copy
+            if data is not None:
+                self.shm.buf[:len(data)] = data
+            # One retry covers a crash between blocks. A block that crashes the decoder twice is dropped
+            for attempt in range(2):
+                try:
+                    self.conn.send((command, arg))
+                    if not self.conn.poll(DECODE_TIMEOUT):
+                        raise TimeoutError('stopped responding')
+                    return self.conn.recv()
+                except (EOFError, OSError, TimeoutError) as e:
+                    if not self.restart(str(e) or 'exited'):
+                        return fallback
+            self.logger.error(f'Decoder process failed twice on {command}, dropping it')
+            return fallback
+
+    def AcceptWaveform(self, data):
+        if len(data) > self.capacity:
+            raise ValueError(f'{len(data)} bytes of audio do not fit in {self.capacity} bytes of shared memory')
+        accepted, result = self.request('accept', len(data), (False, EMPTY_PARTIAL), data)
+        if accepted:
+            self.last_result = result
+        else:
+            self.last_partial = result
+        return accepted
+
+    def Result(self):
+        return self.last_result
+
+    def PartialResult(self):
+        return self.last_partial
+
+    def FinalResult(self):
+        return self.request('final', None, (True, EMPTY_RESULT))[1]
+
+    def SetGrammar(self, grammar):
+        # Kept so a restarted process comes back with the current grammar
+        self.grammar = grammar
+        self.request('grammar', grammar, (True, None))
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            try:
+                self.conn.send(('close', None))
+            except OSError:
+                pass
+            self.process.join(timeout=2)
+            self.kill()
+        self.release_memory()
+
+    def release_memory(self):
+        self.shm.close()
+        self.shm.unlink()
@@ -1,4 +1,5 @@
 from enum import Enum
+from collections import namedtuple
 
 class Phrases(Enum):
     START_REC_PHRASE = 'freya start recording'
@@ -12,4 +13,15 @@ class Phrases(Enum):
 class Options(Enum):
     TTS_OPTION = 'TTS'
     TRAY_OPTION = 'System Tray'
-    NONE_OPTION = 'None'
\ No newline at end of file
+    NONE_OPTION = 'None'
+
+class DecodingModes(Enum):
+    OPEN_MODE = 'Open'
+    GRAMMAR_MODE = 'Grammar'
+    
+class DecoderBackends(Enum):
+    THREAD_BACKEND = 'Thread'
+    PROCESS_BACKEND = 'Process'
+
+# User-defined phrases from commands.yaml. Exposes name and value like a Phrases member
+CustomPhrase = namedtuple('CustomPhrase', ['name', 'value'])
\ No newline at end of file
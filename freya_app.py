@@ -1,19 +1,21 @@
 import sys
 import logging
 import asyncio
-import pyttsx3
+import startup_timing
+import metrics
 
-from yaml_config import load_config, save_config, get_config
+from yaml_config import load_config, save_config, get_config, flush_config
 from obs_controller import OBSRecordingController
 from voice_recognizer import VoskVoiceRecognizer
 from voice_thread import VoiceRecognizerThread
+from tts_worker import TTSWorker
+from tts_cache import TTSClipCache
 from enums import Options
 from rel_path import resource_path
 
 from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QMessageBox
 from PySide6.QtGui import QIcon
 from PySide6.QtCore import QThread, Signal, Slot
-from settings_window import SettingsWindow
 
 class Freya_for_OBS:
     def __init__(self):
@@ -24,9 +26,13 @@ class Freya_for_OBS:
         self.app.setQuitOnLastWindowClosed(False)
         
         self.setup_tray()
-        self.setup_voice_control()
         
-        self.tts_engine = pyttsx3.init()
+        # Driver discovery is slow, so the engine is created once on its own thread
+        self.tts_worker = TTSWorker(clip_cache=TTSClipCache())
+        self.tts_worker.start()
+        
+        self.metrics_server = None
+        self.setup_voice_control()
     
     def setup_tray(self):
         self.tray_menu = QMenu()
@@ -41,33 +47,52 @@ class Freya_for_OBS:
         self.tray_icon.setContextMenu(self.tray_menu)
         
         self.tray_icon.show()
-        self.tray_icon.setToolTip('Voice-controller for OBS')
+        startup_timing.mark('tray shown')
     
     def setup_voice_control(self):
+        self.tray_icon.setToolTip('Voice-controller for OBS (loading...)')
         config = load_config()
+        if config.get('metrics_port') and self.metrics_server is None:
+            try:
+                self.metrics_server = metrics.serve(config['metrics_port'])
+            except OSError as e:
+                self.logger.error(f'Could not serve metrics on port {config["metrics_port"]}: {e}')
         obs_controller = OBSRecordingController(
             host=config['host'],
             port=config['port'],
             password=config['password']
         )
 
-        self.vosk_recognizer = VoskVoiceRecognizer(obs_controller)
+        self.vosk_recognizer = VoskVoiceRecognizer(obs_controller, config)
         self.vosk_recognizer.command_successful.connect(self.activate_notification)
+        self.vosk_recognizer.ready.connect(self.on_voice_ready)
+        self.vosk_recognizer.responses_changed.connect(self.on_responses_changed)
+        self.tts_worker.speech_gate = self.vosk_recognizer
         self.voice_thread = VoiceRecognizerThread(self.vosk_recognizer)
         self.voice_thread.error_occured.connect(self.show_error_message)
         self.voice_thread.start()
         
+    @Slot()
+    def on_voice_ready(self):
+        self.tray_icon.setToolTip('Voice-controller for OBS')
+        
+    @Slot(list)
+    def on_responses_changed(self, responses):
+        # Sent once commands.yaml has been read, so the list is complete and clips outside it can be pruned
+        self.tts_worker.prerender(responses)
+        
     def show_settings(self):
+        # Most sessions never open settings, so keep it out of startup
+        from settings_window import SettingsWindow
+        
         self.settings_window = SettingsWindow()
         self.settings_window.obs_settings_updated.connect(self.update_obs_settings)
         self.settings_window.general_settings_updated.connect(self.update_general_settings)
+        self.settings_window.audio_settings_updated.connect(self.update_audio_settings)
         self.settings_window.show()
     
     @Slot(str, int, str)
     def update_obs_settings(self, host, port, password):
-        self.logger.info('OBS settings updated. Attempting to kill curent thread...')
-        self.kill_thread()
-        
         changes = {
             'host': host,
             'port': port,
@@ -75,8 +100,12 @@ class Freya_for_OBS:
         }
         save_config(get_config(), changes)
         
-        self.logger.info('Restarting voice control with new settings...')
-        self.setup_voice_control()
+        if self.voice_thread.isRunning():
+            self.logger.info('OBS settings updated. Reconnecting to OBS...')
+            self.voice_thread.reconnect_obs(host, port, password)
+        else:
+            self.logger.info('OBS settings updated. Restarting voice control with new settings...')
+            self.setup_voice_control()
         
     @Slot(str, bool)
     def update_general_settings(self, notif, startup):
@@ -88,16 +117,20 @@ class Freya_for_OBS:
         }
         save_config(get_config(), changes)
     
+    @Slot(list)
+    def update_audio_settings(self, devices):
+        save_config(get_config(), {'devices': devices})
+        
+        # Streams and recognizers are per device, so voice control restarts with the new set
+        self.logger.info('Audio devices updated. Restarting voice control...')
+        self.kill_thread()
+        self.setup_voice_control()
+    
     @Slot(str)
     def activate_notification(self, msg):
         check_notif = get_config().get('notifications')
         if check_notif == Options.TTS_OPTION.value:
-            # TTS engine is dumb
-            self.tts_engine = pyttsx3.init()
-            self.tts_engine.say(msg)
-            self.tts_engine.runAndWait()
-            self.tts_engine.stop()
-            del self.tts_engine
+            self.tts_worker.say(msg)
         elif check_notif == Options.TRAY_OPTION.value:
             self.tray_icon.showMessage(
                 'Running command...',
@@ -139,6 +172,10 @@ class Freya_for_OBS:
     def exit(self):
         self.logger.info('Application closing')
         self.kill_thread()
+        self.tts_worker.stop(timeout=2)
+        if self.metrics_server:
+            self.metrics_server.shutdown()
+        flush_config()
         
         self.logger.info('Done')
         self.app.quit()
@@ -9,7 +9,7 @@ a = Analysis(
         ('icons', 'icons'),
         ('model', 'model'),
     ],
-    hiddenimports=['vosk'],
+    hiddenimports=['vosk', 'sounddevice', 'pyttsx3', 'simpleobsws', 'numpy'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
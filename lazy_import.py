@@ -0,0 +1,19 @@
+import sys
+import importlib.util
+
+def lazy_import(name):
+    # Returns the module right away but only executes it on first attribute access.
+    # Callers must use module.attribute, since `from x import y` would load it immediately
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f'No module named {name!r}', name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
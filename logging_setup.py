@@ -0,0 +1,107 @@
+import os
+import copy
+import gzip
+import json
+import queue
+import shutil
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timedelta
+
+LOG_FILE = 'clip_assistant.log'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 14
+TEXT_FORMAT = '%(asctime)s:[%(levelname)s]:(%(name)s):%(message)s'
+DATE_FORMAT = '%H:%M:%S'
+
+def next_midnight(moment):
+    return datetime.combine(moment.date() + timedelta(days=1), datetime.min.time()).timestamp()
+
+def compressed_name(name):
+    return f'{name}.gz'
+
+def compress(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+class DailySizeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    # Rolls over when the file passes max_bytes or the day changes, whichever is first.
+    # Rolled files are gzipped and numbered like RotatingFileHandler's backups
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+        super().__init__(filename, mode='a', maxBytes=max_bytes, backupCount=backups, encoding='utf-8', delay=True)
+        self.namer = compressed_name
+        self.rotator = compress
+        # A file left over from an earlier day is rolled before the first write of this run
+        if os.path.exists(self.baseFilename):
+            self.rollover_at = next_midnight(datetime.fromtimestamp(os.path.getmtime(self.baseFilename)))
+        else:
+            self.rollover_at = next_midnight(datetime.now())
+
+    def shouldRollover(self, record):
+        if datetime.now().timestamp() >= self.rollover_at and os.path.exists(self.baseFilename):
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = next_midnight(datetime.now())
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    # The stock prepare() formats the record here and folds the traceback into the message. Only the
+    # arguments are merged now, the listener's formatter handles the rest so JSON keeps the traceback apart.
+    # The queue never leaves the process, so the traceback objects don't need pickling
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def make_formatter(json_lines):
+    if json_lines:
+        return JsonLinesFormatter()
+    return logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+def set_log_format(listener, json_lines):
+    # Logging starts before the config is read so config messages reach the file. The format is applied after
+    for handler in listener.handlers:
+        handler.setFormatter(make_formatter(json_lines))
+
+def setup_logging(filename=LOG_FILE, json_lines=False, level=logging.INFO):
+    # Loggers only put records on a queue. The listener thread formats them and does the disk writes
+    handler = DailySizeRotatingFileHandler(filename)
+    handler.setFormatter(make_formatter(json_lines))
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(RecordQueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener.start()
+    # Flushes whatever is still queued if the app exits without stopping the listener itself
+    atexit.register(stop_logging, listener)
+    return listener
+
+def stop_logging(listener):
+    if listener._thread is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
@@ -1,25 +1,23 @@
+import startup_timing
 import asyncio
-import logging
 import sys
-from datetime import datetime
 from freya_app import Freya_for_OBS
-        
-def setup_logging():
-    log_file = logging.getLogger(__name__)
-    current_date = datetime.today().strftime('%Y_%m_%d')
-    logging.basicConfig(
-        filename=f'clip_assistant_{current_date}.log', 
-        filemode='w', 
-        format='%(asctime)s:[%(levelname)s]:(%(name)s):%(message)s',
-        datefmt='%H:%M:%S',
-        level=logging.INFO
-    )
-    return log_file
+from logging_setup import setup_logging, set_log_format, stop_logging
+from yaml_config import get_config
+
+startup_timing.mark('imports')
 
 async def main():
-    logger = setup_logging()
+    listener = setup_logging()
+    set_log_format(listener, get_config().get('log_format') == 'json')
     app = Freya_for_OBS() 
     app.run()
+    stop_logging(listener)
     
-asyncio.run(main())
-
+# The process decoder backend spawns children that import this module, they must not start the app
+if __name__ == '__main__':
+    # freeze_support only does anything in a frozen build, and multiprocessing is slow to import
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+    asyncio.run(main())
\ No newline at end of file
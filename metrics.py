@@ -0,0 +1,137 @@
+import logging
+import threading
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# Millisecond bucket bounds, roughly 1-2-5 per decade. Observing is one bisect and two adds
+BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+PERCENTILES = (0.5, 0.9, 0.99)
+
+class Histogram:
+    def __init__(self, name, help_text, labels=None, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels or {}
+        self.buckets = buckets
+        # One extra slot counts everything above the largest bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def percentile(self, fraction):
+        # Linear interpolation inside the bucket that holds the requested rank
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+        if not count:
+            return None
+        rank = fraction * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index else 0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.total, self.count
+
+    def reset(self):
+        with self.lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.total = 0
+            self.count = 0
+
+_histograms = {}
+_lock = threading.Lock()
+
+def histogram(name, help_text, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    hist = _histograms.get(key)
+    if hist is None:
+        with _lock:
+            hist = _histograms.setdefault(key, Histogram(name, help_text, labels))
+    return hist
+
+def reset():
+    # Histograms are created at import time by the modules that observe them, so they're zeroed rather than dropped
+    with _lock:
+        hists = list(_histograms.values())
+    for hist in hists:
+        hist.reset()
+
+def format_labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+def render_prometheus():
+    lines = []
+    described = set()
+    for hist in sorted(list(_histograms.values()), key=lambda hist: hist.name):
+        if hist.name not in described:
+            described.add(hist.name)
+            lines.append(f'# HELP {hist.name} {hist.help_text}')
+            lines.append(f'# TYPE {hist.name} histogram')
+        counts, total, count = hist.snapshot()
+        cumulative = 0
+        for bound, bucket_count in zip(hist.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{hist.name}_bucket{format_labels(hist.labels, le=bound)} {cumulative}')
+        lines.append(f'{hist.name}_bucket{format_labels(hist.labels, le="+Inf")} {count}')
+        lines.append(f'{hist.name}_sum{format_labels(hist.labels)} {total}')
+        lines.append(f'{hist.name}_count{format_labels(hist.labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+def summary():
+    parts = []
+    for hist in sorted(list(_histograms.values()), key=lambda hist: (hist.name, format_labels(hist.labels))):
+        if not hist.count:
+            continue
+        percentiles = ' '.join(f'p{int(fraction * 100)}={hist.percentile(fraction):.2f}' for fraction in PERCENTILES)
+        parts.append(f'{hist.name}{format_labels(hist.labels)} n={hist.count} {percentiles}')
+    return '; '.join(parts)
+
+def log_summary():
+    text = summary()
+    if text:
+        logger.info(f'Metrics: {text}')
+
+def serve(port, host='127.0.0.1'):
+    # Local only. Returns the server so the caller can shut it down
+    # http.server is only imported when the endpoint is enabled, it's slow to import
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='MetricsServer', daemon=True)
+    thread.start()
+    logger.info(f'Serving metrics on http://{host}:{server.server_port}/metrics')
+    return server
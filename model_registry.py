@@ -0,0 +1,37 @@
+import logging
+import threading
+from lazy_import import lazy_import
+
+vosk = lazy_import('vosk')
+
+logger = logging.getLogger(__name__)
+
+# Loaded models live for the whole process, keyed by path, so restarting the recognizer never reloads from disk
+_models = {}
+_lock = threading.Lock()
+
+def get_model(path):
+    with _lock:
+        if path not in _models:
+            logger.info(f'Loading Vosk model from {path}')
+            _models[path] = vosk.Model(path)
+        else:
+            logger.info(f'Reusing loaded Vosk model from {path}')
+        return _models[path]
+
+def swap_model(path):
+    # Loads the new model before evicting the old ones so a bad path leaves the current model in place
+    model = get_model(path)
+    with _lock:
+        for cached_path in [cached for cached in _models if cached != path]:
+            logger.info(f'Releasing Vosk model from {cached_path}')
+            del _models[cached_path]
+    return model
+
+def is_loaded(path):
+    with _lock:
+        return path in _models
+
+def clear():
+    with _lock:
+        _models.clear()
@@ -1,9 +1,32 @@
 import logging
 import sys
-from simpleobsws import WebSocketClient, Request
+import random
+import asyncio
+from time import monotonic, perf_counter
+from lazy_import import lazy_import
+import startup_timing
+import metrics
 
 from PySide6.QtCore import QObject, Signal, Slot
 
+simpleobsws = lazy_import('simpleobsws')
+
+RECORD_OUTPUT = 'record'
+REPLAY_OUTPUT = 'replay'
+STATUS_REQUESTS = {
+    RECORD_OUTPUT: ('GetRecordStatus', 'Could not get recording status'),
+    REPLAY_OUTPUT: ('GetReplayBufferStatus', 'Could not get replay status'),
+}
+RECONNECT_BASE_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30
+HEALTH_CHECK_INTERVAL = 5
+HEALTH_CHECK_TIMEOUT = 2
+# How long a command is held while the supervisor brings the link up before failing
+COMMAND_CONNECT_WAIT = 5
+
+def request_latency(request_type):
+    return metrics.histogram('freya_obs_request_ms', 'OBS WebSocket round trip per request type', request=request_type)
+
 class OBSRecordingController(QObject):
     def __init__(self, host, port, password):
         super().__init__()
@@ -13,46 +36,294 @@ class OBSRecordingController(QObject):
         self.port = port
         self.password = password
         self.ws = None
+        # output -> outputActive. OBS sends a state event on every transition, so while the socket is up the
+        # cache is authoritative. It's dropped on (re)connect and whenever a request on that output fails
+        self.output_state = {}
+        self.link_up = asyncio.Event()
+        self.supervisor = None
+        # Sockets being closed in the background. The event loop only keeps weak references to tasks
+        self.closing = set()
         
     async def connect(self):
+        started = monotonic()
+        ws = None
         try:
-            self.ws = WebSocketClient(
+            ws = self.ws = simpleobsws.WebSocketClient(
                 url=f'ws://{self.host}:{self.port}',
                 password=self.password
             )
+            self.output_state = {}
+            self.ws.register_event_callback(self.on_record_state_changed, 'RecordStateChanged')
+            self.ws.register_event_callback(self.on_replay_state_changed, 'ReplayBufferStateChanged')
             await self.ws.connect()
-            await self.ws.wait_until_identified()
+            # False on a wrong password or when OBS never answers the identify
+            if not await self.ws.wait_until_identified():
+                ws, self.ws = self.ws, None
+                await self.close_stale(ws)
+                raise Exception('OBS did not accept the connection. Check the password')
+            self.link_up.set()
             self.logger.info('Connected to OBS WebSocket successfully')
+            startup_timing.mark('OBS connect', monotonic() - started)
             
+        except asyncio.CancelledError:
+            # The supervisor was stopped mid-connect. Its half-open socket would otherwise never be closed
+            if ws is not None:
+                if self.ws is ws:
+                    self.ws = None
+                self.close_in_background(ws)
+            raise
         except Exception as e:
             self.logger.error(f'OBS connection failed: {e}')
             raise
     
     async def disconnect(self):
+        self.stop_supervisor()
+        self.link_up.clear()
+        self.output_state = {}
         if self.ws:
             await self.ws.disconnect()
             self.logger.info('Disconnected from OBS WebSocket')
     
-    async def establish_connection(self):
-        if not self.ws:
-            self.logger.warning('Not connected to OBS. Attempting to reconnect...')
+    async def reconnect(self, host, port, password):
+        self.logger.info(f'Reconnecting to OBS at {host}:{port}')
+        # disconnect() drops the supervisor, so whether one was running has to be read first
+        supervised = self.supervisor is not None
+        try:
+            await self.disconnect()
+        except Exception as e:
+            self.logger.warning(f'Could not cleanly disconnect from OBS: {e}')
+            
+        self.host = host
+        self.port = port
+        self.password = password
+        self.ws = None
+        try:
             await self.connect()
+        finally:
+            # Even if this attempt failed, the supervisor keeps retrying with the new parameters
+            if supervised:
+                self.start_supervisor()
     
-    async def start_recording(self):
+    def is_connected(self):
+        return self.ws is not None and self.ws.is_identified()
+    
+    def mark_disconnected(self):
+        self.link_up.clear()
+        self.output_state = {}
+        if self.ws:
+            ws, self.ws = self.ws, None
+            self.close_in_background(ws)
+            
+    def close_in_background(self, ws):
+        task = asyncio.create_task(self.close_stale(ws))
+        self.closing.add(task)
+        task.add_done_callback(self.closing.discard)
+            
+    async def close_stale(self, ws):
+        try:
+            await ws.disconnect()
+        except Exception as e:
+            self.logger.debug(f'Stale OBS socket did not close cleanly: {e}')
+    
+    def start_supervisor(self):
+        if self.supervisor is None or self.supervisor.done():
+            self.supervisor = asyncio.create_task(self.supervise())
+            
+    def stop_supervisor(self):
+        if self.supervisor:
+            self.supervisor.cancel()
+            self.supervisor = None
+            
+    async def supervise(self):
+        attempt = 0
+        while True:
+            if not self.is_connected():
+                self.mark_disconnected()
+                try:
+                    await self.connect()
+                    attempt = 0
+                except Exception as e:
+                    delay = min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2 ** attempt)
+                    # Jitter so a restarted OBS isn't hit by every client at the same instant
+                    delay = random.uniform(delay / 2, delay)
+                    attempt += 1
+                    self.logger.warning(f'OBS unreachable. Retrying in {delay:.1f}s (attempt {attempt})')
+                    await asyncio.sleep(delay)
+                    continue
+            
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+            await self.check_health()
+            
+    async def check_health(self):
+        if not self.is_connected():
+            self.logger.warning('OBS WebSocket dropped')
+            self.mark_disconnected()
+            return False
+        try:
+            await self.call(simpleobsws.Request('GetVersion'), timeout=HEALTH_CHECK_TIMEOUT)
+            return True
+        except Exception as e:
+            self.logger.warning(f'OBS health check failed: {e}')
+            self.mark_disconnected()
+            return False
+    
+    async def call(self, request, **kwargs):
+        started = perf_counter()
+        try:
+            return await self.ws.call(request, **kwargs)
+        finally:
+            request_latency(request.requestType).observe((perf_counter() - started) * 1000)
+            
+    async def call_batch(self, requests, **kwargs):
+        started = perf_counter()
+        try:
+            return await self.ws.call_batch(requests, **kwargs)
+        finally:
+            request_latency('RequestBatch').observe((perf_counter() - started) * 1000)
+    
+    def set_output_state(self, output, active):
+        self.output_state[output] = active
+        
+    async def on_record_state_changed(self, event_data):
+        self.set_output_state(RECORD_OUTPUT, event_data['outputActive'])
+        
+    async def on_replay_state_changed(self, event_data):
+        self.set_output_state(REPLAY_OUTPUT, event_data['outputActive'])
+        
+    async def is_output_active(self, output):
+        if output in self.output_state:
+            return self.output_state[output]
+        
+        request_type, error = STATUS_REQUESTS[output]
+        response = await self.call(simpleobsws.Request(request_type))
+        if not response.ok():
+            raise Exception(error)
+        
+        self.set_output_state(output, response.responseData['outputActive'])
+        return response.responseData['outputActive']
+        
+    async def send_output_request(self, output, request_type, active_after):
+        try:
+            response = await self.call(simpleobsws.Request(request_type))
+        except Exception:
+            self.output_state.pop(output, None)
+            raise
+        if response.ok():
+            # The state event will confirm this, but the next command shouldn't have to wait for it
+            self.set_output_state(output, active_after)
+        else:
+            self.output_state.pop(output, None)
+        return response.ok()
+    
+    async def run_output_batch(self, actions):
+        # actions is a list of (output, request_type, active_after). Requests whose output is
+        # already in the wanted state are skipped, the rest go to OBS as one RequestBatch
+        unknown = [output for output, _, _ in actions if output not in self.output_state]
+        if unknown:
+            status_requests = [simpleobsws.Request(STATUS_REQUESTS[output][0]) for output in unknown]
+            for output, response in zip(unknown, await self.call_batch(status_requests)):
+                if not response.ok():
+                    raise Exception(STATUS_REQUESTS[output][1])
+                self.set_output_state(output, response.responseData['outputActive'])
+        
+        needed = []
+        for output, request_type, active_after in actions:
+            if self.output_state[output] == active_after:
+                self.logger.warning(f'Skipping {request_type}, {output} output already in that state')
+            else:
+                needed.append((output, request_type, active_after))
+        if not needed:
+            return {}
+        
+        requests = [simpleobsws.Request(request_type) for _, request_type, _ in needed]
+        try:
+            responses = await self.call_batch(requests, halt_on_failure=False)
+        except Exception:
+            for output, _, _ in needed:
+                self.output_state.pop(output, None)
+            raise
+        
+        results = {}
+        for (output, request_type, active_after), response in zip(needed, responses):
+            results[request_type] = response.ok()
+            if response.ok():
+                self.set_output_state(output, active_after)
+                self.logger.info(f'{request_type} succeeded')
+            else:
+                self.output_state.pop(output, None)
+                self.logger.error(f'{request_type} failed: {response.requestStatus.comment}')
+        
+        failed = [request_type for request_type, ok in results.items() if not ok]
+        if failed:
+            raise Exception(f'Batch requests failed: {", ".join(failed)}')
+        return results
+    
+    async def start_everything(self):
+        await self.establish_connection()
+        
+        try:
+            return await self.run_output_batch([
+                (RECORD_OUTPUT, 'StartRecord', True),
+                (REPLAY_OUTPUT, 'StartReplayBuffer', True),
+            ])
+        except Exception as e:
+            self.logger.error(f'Failed to start everything: {e}')
+            raise
+    
+    async def stop_everything(self):
         await self.establish_connection()
         
         try:
-            rec_request = Request('GetRecordStatus')
-            rec_response = await self.ws.call(rec_request)
+            return await self.run_output_batch([
+                (RECORD_OUTPUT, 'StopRecord', False),
+                (REPLAY_OUTPUT, 'StopReplayBuffer', False),
+            ])
+        except Exception as e:
+            self.logger.error(f'Failed to stop everything: {e}')
+            raise
+    
+    async def call_requests(self, requests):
+        # Arbitrary obs-websocket requests from commands.yaml, sent as one batch that halts on the first failure
+        await self.establish_connection()
+        
+        try:
+            batch = [simpleobsws.Request(request['requestType'], request.get('requestData')) for request in requests]
+            responses = await self.call_batch(batch, halt_on_failure=True)
             
-            if not rec_response.ok():
-                raise Exception('Could not get recording status')
-
-            if not rec_response.responseData['outputActive']:
-                start_rec_req = Request('StartRecord')
-                start_rec_res = await self.ws.call(start_rec_req)
-                
-                if start_rec_res.ok():
+            failed = [request.requestType for request, response in zip(batch, responses) if not response.ok()]
+            if len(responses) < len(batch):
+                failed.extend(request.requestType for request in batch[len(responses):])
+            if failed:
+                raise Exception(f'Requests failed: {", ".join(failed)}')
+            self.logger.info(f'Custom requests succeeded: {", ".join(request.requestType for request in batch)}')
+            return responses
+        except Exception as e:
+            self.logger.error(f'Failed to run custom command: {e}')
+            raise
+    
+    async def establish_connection(self):
+        if self.is_connected():
+            return
+        # The link dropped since the last health check. Hold commands until the supervisor has it back
+        self.link_up.clear()
+        
+        if self.supervisor and not self.supervisor.done():
+            # The supervisor is bringing the link up. Hold the command briefly rather than racing it
+            try:
+                await asyncio.wait_for(self.link_up.wait(), COMMAND_CONNECT_WAIT)
+            except asyncio.TimeoutError:
+                raise Exception('Not connected to OBS')
+            return
+        
+        self.logger.warning('Not connected to OBS. Attempting to reconnect...')
+        await self.connect()
+    
+    async def start_recording(self):
+        await self.establish_connection()
+        
+        try:
+            if not await self.is_output_active(RECORD_OUTPUT):
+                if await self.send_output_request(RECORD_OUTPUT, 'StartRecord', True):
                     self.logger.info('Recording started sucessfully')
                 else:
                     raise Exception('Could not start recording')
@@ -67,17 +338,8 @@ class OBSRecordingController(QObject):
         await self.establish_connection()
         
         try:
-            rec_request = Request('GetRecordStatus')
-            rec_response = await self.ws.call(rec_request)
-            
-            if not rec_response.ok():
-                raise Exception('Could not get recording status')
-            
-            if rec_response.responseData['outputActive']:
-                stop_rec_req = Request('StopRecord')
-                stop_rec_res = await self.ws.call(stop_rec_req)
-                
-                if stop_rec_res.ok():
+            if await self.is_output_active(RECORD_OUTPUT):
+                if await self.send_output_request(RECORD_OUTPUT, 'StopRecord', False):
                     self.logger.info('Recording stopped sucessfully')
                 else:
                     raise Exception('Could not stop recording')
@@ -92,17 +354,8 @@ class OBSRecordingController(QObject):
         await self.establish_connection()
         
         try:
-            replay_request = Request('GetReplayBufferStatus')
-            replay_response = await self.ws.call(replay_request)
-            
-            if not replay_response.ok():
-                raise Exception('Could not get replay status')
-                
-            if not replay_response.responseData['outputActive']:
-                start_replay_req = Request('StartReplayBuffer')
-                start_replay_res = await self.ws.call(start_replay_req)
-                
-                if start_replay_res.ok():
+            if not await self.is_output_active(REPLAY_OUTPUT):
+                if await self.send_output_request(REPLAY_OUTPUT, 'StartReplayBuffer', True):
                     self.logger.info('Replay buffer started successfully')
                 else:
                     raise Exception('Could not start replay buffer')
@@ -117,17 +370,8 @@ class OBSRecordingController(QObject):
         await self.establish_connection()
         
         try:
-            replay_request = Request('GetReplayBufferStatus')
-            replay_response = await self.ws.call(replay_request)
-            
-            if not replay_response.ok():
-                raise Exception('Could not get replay status')
-                
-            if replay_response.responseData['outputActive']:
-                stop_replay_req = Request('StopReplayBuffer')
-                stop_replay_res = await self.ws.call(stop_replay_req)
-                
-                if stop_replay_res.ok():
+            if await self.is_output_active(REPLAY_OUTPUT):
+                if await self.send_output_request(REPLAY_OUTPUT, 'StopReplayBuffer', False):
                     self.logger.info('Replay buffer stopped successfully')
                 else:
                     raise Exception('Could not stop replay buffer')
@@ -142,16 +386,9 @@ class OBSRecordingController(QObject):
         await self.establish_connection()
         
         try:
-            replay_request = Request('GetReplayBufferStatus')
-            replay_response = await self.ws.call(replay_request)
-            if not replay_response.ok():
-                raise Exception('Could not get replay status') 
-                
-            if replay_response.responseData['outputActive']:
-                save_replay_req = Request('SaveReplayBuffer')
-                save_replay_res = await self.ws.call(save_replay_req)
-                
-                if save_replay_res.ok():
+            if await self.is_output_active(REPLAY_OUTPUT):
+                # Saving leaves the buffer running
+                if await self.send_output_request(REPLAY_OUTPUT, 'SaveReplayBuffer', True):
                     self.logger.info('Replay buffer saved successfully')
                 else:
                     raise Exception('Could not save replay buffer')
@@ -0,0 +1,74 @@
+def phrase_values(phrases):
+    values = []
+    for phrase in phrases:
+        if isinstance(phrase.value, list):
+            values.extend(phrase.value)
+        else:
+            values.append(phrase.value)
+    return values
+
+class PhraseMatcher:
+    # Token trie over every command phrase. A transcript is matched in one left-to-right pass.
+    # The work per word is bounded by the longest phrase, not by how many phrases there are.
+    # Overlapping phrases resolve to the longest match, then to whichever was added first.
+    def __init__(self, entries=()):
+        self.root = {}
+        self.count = 0
+        for text, key in entries:
+            self.add(text, key)
+
+    @classmethod
+    def from_phrases(cls, phrases):
+        return cls((value, phrase) for phrase in phrases for value in phrase_values([phrase]))
+
+    def add(self, text, key):
+        node = self.root
+        for token in text.lower().split():
+            node = node.setdefault(token, {})
+        # The None slot marks the end of a phrase. The first phrase added keeps the slot
+        if None not in node:
+            node[None] = (self.count, key)
+            self.count += 1
+
+    def remove(self, text, key):
+        # Only removes the phrase if it still belongs to key, so a shadowed duplicate can't take out the original
+        path = [self.root]
+        for token in text.lower().split():
+            node = path[-1].get(token)
+            if node is None:
+                return
+            path.append(node)
+        if path[-1].get(None, (None, None))[1] != key:
+            return
+        
+        del path[-1][None]
+        tokens = text.lower().split()
+        for depth in range(len(tokens), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][tokens[depth - 1]]
+
+    def find(self, text):
+        tokens = text.lower().split()
+        found = []
+        position = 0
+        while position < len(tokens):
+            match, length = self.longest_match(tokens, position)
+            if match is None:
+                position += 1
+                continue
+            if match not in found:
+                found.append(match)
+            position += length
+        return found
+
+    def longest_match(self, tokens, start):
+        node = self.root
+        best, best_length = None, 0
+        for index in range(start, len(tokens)):
+            node = node.get(tokens[index])
+            if node is None:
+                break
+            if None in node:
+                best, best_length = node[None][1], index - start + 1
+        return best, best_length
@@ -0,0 +1,169 @@
+import wave
+import asyncio
+import logging
+import threading
+from collections import namedtuple
+from time import perf_counter, process_time, sleep
+
+SAMPLE_WIDTH = 2
+# Vosk only finalises an utterance once it hears silence after it
+TAIL_SILENCE = 1.0
+
+ReplayResult = namedtuple('ReplayResult', ['audio_seconds', 'wall_seconds', 'cpu_seconds'])
+
+def read_wav(path, sample_rate):
+    with wave.open(path, 'rb') as wav:
+        if wav.getsampwidth() != SAMPLE_WIDTH or wav.getnchannels() != 1:
+            raise ValueError(f'{path} must be 16-bit mono')
+        if wav.getframerate() != sample_rate:
+            raise ValueError(f'{path} is {wav.getframerate()} Hz, expected {sample_rate} Hz')
+        return wav.readframes(wav.getnframes())
+
+class FakeOBSController:
+    # Records which actions fired and how far into the audio they fired instead of talking to OBS
+    def __init__(self, clock=lambda: None):
+        self.clock = clock
+        self.actions = []
+
+    def record(self, action):
+        self.actions.append((action, self.clock()))
+
+    def start_supervisor(self):
+        pass
+
+    def stop_supervisor(self):
+        pass
+
+    async def connect(self):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    async def start_recording(self):
+        self.record('start_recording')
+
+    async def stop_recording(self):
+        self.record('stop_recording')
+
+    async def start_replay_buffer(self):
+        self.record('start_replay_buffer')
+
+    async def stop_replay_buffer(self):
+        self.record('stop_replay_buffer')
+
+    async def save_replay_buffer(self):
+        self.record('save_replay_buffer')
+
+    async def start_everything(self):
+        self.record('start_everything')
+
+    async def stop_everything(self):
+        self.record('stop_everything')
+
+    async def call_requests(self, requests):
+        for request in requests:
+            self.record(request['requestType'])
+
+class WavFileStream:
+    # Stands in for sd.RawInputStream. Audio is handed to the callback block by block from its own thread,
+    # either at the pace of the recording or as fast as the consumer keeps up with
+    def __init__(self, frames, *, samplerate, blocksize, callback, realtime=False, ready=None, **kwargs):
+        self.frames = frames
+        self.sample_rate = samplerate
+        self.block_bytes = blocksize * SAMPLE_WIDTH
+        self.callback = callback
+        self.realtime = realtime
+        self.ready = ready
+        self.delivered = 0
+        self.active = False
+        self.finished = threading.Event()
+        self.thread = None
+
+    @property
+    def position(self):
+        return self.delivered / SAMPLE_WIDTH / self.sample_rate
+
+    def start(self):
+        self.active = True
+        self.thread = threading.Thread(target=self.run, name='WavFileStream', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.active = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def close(self):
+        self.stop()
+
+    def run(self):
+        started = perf_counter()
+        try:
+            for offset in range(0, len(self.frames), self.block_bytes):
+                if not self.active:
+                    break
+                block = self.frames[offset:offset + self.block_bytes]
+                if self.realtime:
+                    delay = started + offset / SAMPLE_WIDTH / self.sample_rate - perf_counter()
+                    if delay > 0:
+                        sleep(delay)
+                elif self.ready:
+                    # Without backpressure the ring buffer would overflow and drop audio
+                    while self.active and not self.ready():
+                        sleep(0.0005)
+                self.delivered = offset + len(block)
+                self.callback(block, len(block) // SAMPLE_WIDTH, None, None)
+        finally:
+            self.finished.set()
+
+async def replay(recognizer, frames, realtime=False, tail_silence=TAIL_SILENCE):
+    # Drives one recording through voice_callback, process_audio and phrase_handler exactly as a mic would
+    logger = logging.getLogger(__name__)
+    loop = asyncio.get_running_loop()
+    if recognizer.recognizer is None:
+        await loop.run_in_executor(recognizer.executor, recognizer.load_model)
+
+    frames = frames + bytes(int(tail_silence * recognizer.sample_rate) * SAMPLE_WIDTH)
+    blocksize = recognizer.speech_block_size if recognizer.adaptive_blocks else recognizer.block_size
+    stream = WavFileStream(
+        frames,
+        samplerate=recognizer.sample_rate,
+        blocksize=blocksize,
+        callback=recognizer.voice_callback,
+        realtime=realtime,
+        ready=lambda: len(recognizer.audio_buffer) < recognizer.block_size * SAMPLE_WIDTH
+    )
+    recognizer.audio_stream = stream
+    if isinstance(recognizer.obs_controller, FakeOBSController):
+        recognizer.obs_controller.clock = lambda: stream.position
+    recognizer.loop = loop
+    recognizer.isRunning = True
+    recognizer.stopping = False
+
+    wall_start = perf_counter()
+    cpu_start = process_time()
+    consumer = asyncio.create_task(recognizer.process_audio())
+    stream.start()
+    await loop.run_in_executor(None, stream.finished.wait)
+
+    # Whatever is still buffered gets one last pass before the consumer stops
+    while len(recognizer.audio_buffer) and not consumer.done():
+        recognizer.data_ready.set()
+        await asyncio.sleep(0.001)
+    recognizer.isRunning = False
+    recognizer.wake()
+    await consumer
+
+    is_final, text = await loop.run_in_executor(recognizer.executor, recognizer.decode, b'', True)
+    if text:
+        await recognizer.phrase_handler(text, skip=recognizer.fired_phrases)
+    recognizer.fired_phrases = set()
+
+    result = ReplayResult(
+        audio_seconds=len(frames) / SAMPLE_WIDTH / recognizer.sample_rate,
+        wall_seconds=perf_counter() - wall_start,
+        cpu_seconds=process_time() - cpu_start
+    )
+    logger.info(f'Replayed {result.audio_seconds:.1f}s of audio in {result.wall_seconds:.2f}s')
+    return result
@@ -0,0 +1,72 @@
+from math import gcd
+from lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+TAPS_PER_PHASE = 32
+KAISER_BETA = 8.0
+# Pass band edge as a fraction of the output Nyquist. Speech above ~7 kHz doesn't help Vosk anyway
+CUTOFF = 0.9
+
+class StreamResampler:
+    # Turns interleaved int16 audio at the device's rate and channel count into 16-bit mono at out_rate.
+    # Channels are averaged, then a polyphase FIR resamples by out_rate/in_rate. Every output sample whose
+    # inputs have arrived is produced straight away, so the only delay is half the filter (under 1 ms).
+    # Allocates per call, so it runs on the consumer rather than in the PortAudio callback
+    def __init__(self, in_rate, out_rate, channels=1, taps_per_phase=TAPS_PER_PHASE):
+        divisor = gcd(in_rate, out_rate)
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self.channels = channels
+        self.taps = taps_per_phase
+        self.filters = self.design_filters()
+        self.reset()
+
+    def reset(self):
+        # Starts over from silence, for when the input skipped ahead. history holds the input samples future
+        # outputs still need and buffer_start is the absolute index of the first one
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        self.buffer_start = -(self.taps - 1)
+        self.next_output = 0
+
+    @property
+    def delay(self):
+        # Group delay of the filter, in input samples
+        return (self.taps * self.up - 1) / 2 / self.up
+
+    def design_filters(self):
+        length = self.taps * self.up
+        cutoff = CUTOFF * 0.5 / max(self.up, self.down)
+        positions = np.arange(length) - (length - 1) / 2
+        prototype = 2 * cutoff * np.sinc(2 * cutoff * positions) * np.kaiser(length, KAISER_BETA)
+        # Zero-stuffing by `up` divides the level by `up`, so each phase is scaled back to unity gain
+        prototype *= self.up / prototype.sum()
+        # Row p holds the taps used at phase p, reversed so they line up with a forward window of input
+        return prototype.reshape(self.taps, self.up).T[:, ::-1].astype(np.float32).copy()
+
+    def downmix(self, data):
+        samples = np.frombuffer(data, dtype=np.int16)
+        if self.channels == 1:
+            return samples.astype(np.float32)
+        return samples.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+
+    def process(self, data):
+        buffer = np.concatenate((self.history, self.downmix(data)))
+        available = self.buffer_start + len(buffer)
+
+        # Output n needs input n * down / up and the taps - 1 samples before it
+        last = (available * self.up - 1) // self.down
+        outputs = np.arange(self.next_output, last + 1)
+        positions = outputs * self.down
+        inputs = positions // self.up
+        phases = positions % self.up
+
+        windows = np.lib.stride_tricks.sliding_window_view(buffer, self.taps)
+        starts = inputs - (self.taps - 1) - self.buffer_start
+        mixed = np.einsum('ij,ij->i', windows[starts], self.filters[phases])
+
+        self.next_output = last + 1
+        keep_from = (self.next_output * self.down) // self.up - (self.taps - 1)
+        self.history = buffer[keep_from - self.buffer_start:]
+        self.buffer_start = keep_from
+        return np.clip(np.rint(mixed), -32768, 32767).astype(np.int16).tobytes()
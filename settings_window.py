@@ -1,17 +1,41 @@
 from yaml_config import get_config
 from enums import Options
 from rel_path import resource_path
+from lazy_import import lazy_import
 
 from PySide6.QtWidgets import ( 
     QWidget, QVBoxLayout, QFormLayout, QLabel, QLineEdit, 
-    QPushButton, QTabWidget, QComboBox, QCheckBox 
+    QPushButton, QTabWidget, QComboBox, QCheckBox, QListWidget, QListWidgetItem
 )
 from PySide6.QtGui import QIcon
-from PySide6.QtCore import Signal
+from PySide6.QtCore import Signal, Qt
+
+sd = lazy_import('sounddevice')
+
+def input_devices():
+    # Maps "name, host API" to the name shown. sounddevice matches that string exactly, where a bare name is
+    # ambiguous on Windows: every microphone is listed under MME, DirectSound, WASAPI and WDM-KS alike.
+    # Each name is listed once, preferring the default input's host API
+    try:
+        devices = [device for device in sd.query_devices() if device['max_input_channels'] > 0]
+        hostapis = sd.query_hostapis()
+    except Exception:
+        return {}
+    try:
+        default_hostapi = sd.query_devices(kind='input')['hostapi']
+    except Exception:
+        default_hostapi = None
+    
+    listed = {}
+    for device in sorted(devices, key=lambda device: device['hostapi'] != default_hostapi):
+        if device['name'] not in listed.values():
+            listed[f"{device['name']}, {hostapis[device['hostapi']]['name']}"] = device['name']
+    return listed
 
 class SettingsWindow(QWidget):
     obs_settings_updated = Signal(str, int, str)
     general_settings_updated = Signal(str, bool)
+    audio_settings_updated = Signal(list)
     
     def __init__(self):
         super().__init__()
@@ -25,6 +49,7 @@ class SettingsWindow(QWidget):
         self.tabs = QTabWidget(self)
         self.setup_general_tab()
         self.setup_OBS_tab()
+        self.setup_audio_tab()
         
         main_layout = QVBoxLayout()
         main_layout.addWidget(self.tabs)
@@ -80,6 +105,32 @@ class SettingsWindow(QWidget):
         obs_tab.setLayout(obs_layout)
         self.tabs.addTab(obs_tab, 'OBS')
         
+    def setup_audio_tab(self):
+        audio_tab = QWidget()
+        audio_layout = QVBoxLayout()
+        
+        audio_layout.addWidget(QLabel('Listen on these microphones (none selected uses the default):'))
+        self.device_list = QListWidget()
+        selected = self.config.get('devices') or ([self.config['device']] if self.config.get('device') else [])
+        # Devices picked earlier but not plugged in right now stay listed so they aren't lost on save
+        available = input_devices()
+        missing = {device: device for device in selected if device not in available}
+        for device, name in {**available, **missing}.items():
+            # Indices typed into config.yaml come back as ints
+            item = QListWidgetItem(str(name))
+            item.setData(Qt.ItemDataRole.UserRole, device)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked if device in selected else Qt.CheckState.Unchecked)
+            self.device_list.addItem(item)
+        audio_layout.addWidget(self.device_list)
+        
+        save_button = QPushButton('Save')
+        save_button.clicked.connect(self.save_audio_settings)
+        audio_layout.addWidget(save_button)
+        
+        audio_tab.setLayout(audio_layout)
+        self.tabs.addTab(audio_tab, 'Audio')
+        
     def save_obs_settings(self):
         self.error_label.setText('')
         
@@ -104,4 +155,14 @@ class SettingsWindow(QWidget):
         notif = self.notif_dropdown.currentText()
         startup = self.startup_checkbox.isChecked()
         
-        self.general_settings_updated.emit(notif, startup)
\ No newline at end of file
+        self.general_settings_updated.emit(notif, startup)
+        
+    def save_audio_settings(self):
+        devices = []
+        for index in range(self.device_list.count()):
+            item = self.device_list.item(index)
+            if item.checkState() == Qt.CheckState.Checked:
+                devices.append(item.data(Qt.ItemDataRole.UserRole))
+        
+        self.audio_settings_updated.emit(devices)
+        self.close()
\ No newline at end of file
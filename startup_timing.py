@@ -0,0 +1,33 @@
+import logging
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+# Imported first by main.py, so this is as close to interpreter start as we can measure
+PROCESS_START = perf_counter()
+REPORT_AFTER = 'first audio block'
+# OBS connects in the background and may come up long after audio, e.g. when started at login before OBS.
+# Arriving after the report, these log it again so the timing isn't lost
+LATE_MARKS = ('OBS connect',)
+
+_marks = {}
+
+def mark(name, duration=None):
+    # Only the first occurrence counts. Later restarts of the voice thread aren't startup
+    if name in _marks:
+        return
+    _marks[name] = (perf_counter() - PROCESS_START, duration)
+    if name == REPORT_AFTER or (name in LATE_MARKS and REPORT_AFTER in _marks):
+        report()
+
+def report():
+    parts = []
+    for name, (elapsed, duration) in _marks.items():
+        if duration is None:
+            parts.append(f'{name} at {elapsed:.2f}s')
+        else:
+            parts.append(f'{name} took {duration:.2f}s (done at {elapsed:.2f}s)')
+    logger.info(f'Startup timing: {", ".join(parts)}')
+
+def reset():
+    _marks.clear()
@@ -0,0 +1,54 @@
+import tracemalloc
+from audio_buffer import AudioRingBuffer
+
+def test_read_returns_everything_written_in_order():
+    buffer = AudioRingBuffer(16)
+    buffer.write(b'\x01\x02\x03\x04')
+    buffer.write(b'\x05\x06')
+    
+    arrival, data = buffer.read()
+    assert data == b'\x01\x02\x03\x04\x05\x06'
+    assert arrival is not None
+    assert len(buffer) == 0
+    assert buffer.read()[1] == b''
+    
+def test_write_wraps_around_the_end():
+    buffer = AudioRingBuffer(8)
+    buffer.write(b'\x00' * 6)
+    buffer.read()
+    buffer.write(b'\x01\x02\x03\x04\x05\x06')
+    
+    assert buffer.read()[1] == b'\x01\x02\x03\x04\x05\x06'
+    assert buffer.dropped_bytes == 0
+    
+def test_overflow_drops_oldest_and_counts():
+    buffer = AudioRingBuffer(8)
+    buffer.write(b'\x01\x01\x02\x02\x03\x03')
+    buffer.write(b'\x04\x04\x05\x05')
+    
+    assert buffer.read()[1] == b'\x02\x02\x03\x03\x04\x04\x05\x05'
+    assert buffer.dropped_bytes == 2
+    assert buffer.overflows == 1
+    
+def test_write_larger_than_capacity_keeps_newest():
+    buffer = AudioRingBuffer(4)
+    buffer.write(b'\x09\x09')
+    buffer.write(b'\x01\x01\x02\x02\x03\x03')
+    
+    assert buffer.read()[1] == b'\x02\x02\x03\x03'
+    assert buffer.dropped_bytes == 4
+    
+def test_memory_stays_flat_while_streaming():
+    buffer = AudioRingBuffer(16000 * 2 * 10)
+    block = bytearray(16000)
+    
+    tracemalloc.start()
+    for _ in range(200):
+        buffer.write(block)
+    baseline = tracemalloc.get_traced_memory()[0]
+    for _ in range(2000):
+        buffer.write(block)
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    assert current - baseline < 1024
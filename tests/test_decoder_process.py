@@ -0,0 +1,106 @@
+import os
+import json
+import pytest
+import decoder_process
+import voice_recognizer as vr
+from decoder_process import ProcessDecoder
+from voice_recognizer import VoskVoiceRecognizer
+from enums import DecoderBackends
+from yaml_config import DEFAULT_CONFIG
+
+def fake_worker(conn, shm_name, model_path, sample_rate, grammar):
+    # Stands in for Vosk: b'crash' kills the process, any other non-silent audio is a finished utterance
+    from multiprocessing import shared_memory
+    if model_path == 'missing':
+        conn.send(('error', 'no model'))
+        return
+    shm = shared_memory.SharedMemory(name=shm_name)
+    conn.send(('ready', None))
+    while True:
+        command, arg = conn.recv()
+        if command == 'accept':
+            data = bytes(shm.buf[:arg])
+            if data == b'crash':
+                os._exit(1)
+            if data.strip(b'\x00'):
+                conn.send((True, json.dumps({'text': f'freya clip it {grammar or ""}'.strip()})))
+            else:
+                conn.send((False, json.dumps({'partial': 'freya'})))
+        elif command == 'final':
+            conn.send((True, json.dumps({'text': 'final'})))
+        elif command == 'grammar':
+            grammar = arg
+            conn.send((True, None))
+        elif command == 'close':
+            break
+    shm.close()
+
+@pytest.fixture
+def decoder():
+    decoder = ProcessDecoder('model', 16000, capacity=64, target=fake_worker)
+    yield decoder
+    decoder.close()
+    
+def test_results_come_back_from_the_process(decoder):
+    assert not decoder.AcceptWaveform(b'\x00' * 32)
+    assert json.loads(decoder.PartialResult())['partial'] == 'freya'
+    
+    assert decoder.AcceptWaveform(b'\x01' * 32)
+    assert json.loads(decoder.Result())['text'] == 'freya clip it'
+    assert json.loads(decoder.FinalResult())['text'] == 'final'
+    
+def test_crashed_process_is_restarted_with_its_grammar(decoder):
+    decoder.SetGrammar('["freya clip it"]')
+    first_pid = decoder.process.pid
+    
+    # The block that killed it twice is dropped, the next one decodes normally
+    assert not decoder.AcceptWaveform(b'crash')
+    assert decoder.restarts == 2
+    assert decoder.process.pid != first_pid
+    
+    assert decoder.AcceptWaveform(b'\x01' * 32)
+    assert json.loads(decoder.Result())['text'] == 'freya clip it ["freya clip it"]'
+    
+def test_failed_relaunch_is_retried_with_backoff(decoder, caplog):
+    decoder.model_path = 'missing'
+    with caplog.at_level('ERROR'):
+        assert not decoder.AcceptWaveform(b'crash')
+    assert 'could not be restarted' in caplog.text
+    assert decoder.failed_launches == 1
+    
+    # Before the retry time audio is dropped without trying again
+    assert not decoder.AcceptWaveform(b'\x01' * 32)
+    assert decoder.failed_launches == 1
+    
+    decoder.model_path = 'model'
+    decoder.retry_at = 0
+    assert decoder.AcceptWaveform(b'\x01' * 32)
+    assert decoder.retry_at is None and decoder.failed_launches == 0
+    
+def test_oversized_block_rejected(decoder):
+    with pytest.raises(ValueError):
+        decoder.AcceptWaveform(b'\x01' * 65)
+        
+def test_model_error_raised_at_start():
+    with pytest.raises(Exception) as exc:
+        ProcessDecoder('missing', 16000, capacity=64, target=fake_worker)
+    assert 'no model' in str(exc.value)
+    
+def test_recognizer_uses_process_backend(monkeypatch):
+    created = []
+    class FakeDecoder:
+        def __init__(self, model_path, sample_rate, grammar, capacity):
+            created.append((model_path, sample_rate, grammar, capacity))
+        def close(self):
+            self.closed = True
+    monkeypatch.setattr(decoder_process, 'ProcessDecoder', FakeDecoder)
+    monkeypatch.setattr(vr, 'get_model', lambda path: pytest.fail('model loaded in the app process'))
+    
+    config = {**DEFAULT_CONFIG, 'decoder_backend': DecoderBackends.PROCESS_BACKEND.value}
+    recognizer = VoskVoiceRecognizer(None, config)
+    recognizer.load_model()
+    
+    assert isinstance(recognizer.recognizer, FakeDecoder)
+    assert created == [(recognizer.model_path, 16000, None, 16000 * vr.SAMPLE_WIDTH * (vr.BUFFER_SECONDS + 1))]
+    recognizer.close_recognizer()
+    assert recognizer.recognizer.closed
@@ -20,7 +20,10 @@ class DummyTrayIcon:
     def showMessage(self, title, msg, icon, duration): self.msg = (title, msg, icon, duration)
 
 class DummyRecognizer:
-    def __init__(self): self.command_successful = DummySignal()
+    def __init__(self):
+        self.command_successful = DummySignal()
+        self.ready = DummySignal()
+        self.responses_changed = DummySignal()
 
 class DummyThread:
     def __init__(self): self.error_occured = DummySignal()
@@ -29,13 +32,17 @@ class DummyThread:
     def req_stop(self): self.stopped = True
     def wait(self): self.waited = True
     def quit(self): self.quitted = True
+    def reconnect_obs(self, host, port, password): self.reconnected = (host, port, password)
 
 class DummySignal:
     def connect(self, slot): self.slot = slot
 
-class DummyTTS:
-    def say(self, msg): self.msg = msg
-    def runAndWait(self): self.ran = True
+class DummyTTSWorker:
+    def __init__(self, clip_cache=None): self.said = []
+    def start(self): self.started = True
+    def say(self, msg): self.said.append(msg)
+    def prerender(self, texts): self.prerendered = texts
+    def stop(self, timeout=None): self.stopped = True
 
 @pytest.fixture(autouse=True)
 def patch_freya(qtbot, monkeypatch):
@@ -43,9 +50,10 @@ def patch_freya(qtbot, monkeypatch):
     monkeypatch.setattr('freya_app.QSystemTrayIcon', DummyTrayIcon)
     monkeypatch.setattr('freya_app.load_config', lambda: {'host': 'localhost', 'port': 4455, 'password': 'pass'})
     monkeypatch.setattr('freya_app.OBSRecordingController', lambda host, port, password: None)
-    monkeypatch.setattr('freya_app.VoskVoiceRecognizer', lambda obs: DummyRecognizer())
+    monkeypatch.setattr('freya_app.VoskVoiceRecognizer', lambda obs, config: DummyRecognizer())
     monkeypatch.setattr('freya_app.VoiceRecognizerThread', lambda rec: DummyThread())
-    monkeypatch.setattr('freya_app.pyttsx3.init', lambda: DummyTTS())
+    monkeypatch.setattr('freya_app.TTSWorker', DummyTTSWorker)
+    monkeypatch.setattr('freya_app.TTSClipCache', lambda: None)
 
 @pytest.mark.usefixtures('patch_freya')
 def test_app_initialization():
@@ -53,14 +61,21 @@ def test_app_initialization():
     assert isinstance(app.app, DummyApp)
     assert isinstance(app.tray_icon, DummyTrayIcon)
     assert app.tray_icon.visible is True
+    assert app.tray_icon.tooltip == 'Voice-controller for OBS (loading...)'
+    
+    app.vosk_recognizer.ready.slot()
     assert app.tray_icon.tooltip == 'Voice-controller for OBS'
+    assert not hasattr(app.tts_worker, 'prerendered')
+    app.vosk_recognizer.responses_changed.slot(['Clipping', 'Switching scene'])
+    assert app.tts_worker.prerendered == ['Clipping', 'Switching scene']
+    assert app.tts_worker.speech_gate is app.vosk_recognizer
     
 @pytest.mark.usefixtures('patch_freya')
 def test_activate_notification_tts(monkeypatch):
     monkeypatch.setattr('freya_app.get_config', lambda: {'notifications': Options.TTS_OPTION.value})
     app = Freya_for_OBS()
     app.activate_notification('Testing TTS')
-    assert app.tts_engine.msg == 'Testing TTS'
+    assert app.tts_worker.said == ['Testing TTS']
 
 @pytest.mark.usefixtures('patch_freya')
 def test_activate_notification_tray(monkeypatch):
@@ -73,4 +88,31 @@ def test_activate_notification_tray(monkeypatch):
 def test_exit(monkeypatch):
     app = Freya_for_OBS()
     app.exit()
-    assert app.app.quit_called is True
\ No newline at end of file
+    assert app.app.quit_called is True
+    assert app.tts_worker.stopped is True
+    
+@pytest.mark.usefixtures('patch_freya')
+def test_update_obs_settings_reconnects_without_restart(monkeypatch):
+    saved = []
+    monkeypatch.setattr('freya_app.get_config', lambda: {})
+    monkeypatch.setattr('freya_app.save_config', lambda config, updates: saved.append(updates))
+    app = Freya_for_OBS()
+    thread = app.voice_thread
+    
+    app.update_obs_settings('127.0.0.1', 4456, 'secret')
+    assert app.voice_thread is thread
+    assert thread.reconnected == ('127.0.0.1', 4456, 'secret')
+    assert saved[0]['port'] == 4456
+    
+@pytest.mark.usefixtures('patch_freya')
+def test_update_audio_settings_restarts_voice_control(monkeypatch):
+    saved = []
+    monkeypatch.setattr('freya_app.get_config', lambda: {})
+    monkeypatch.setattr('freya_app.save_config', lambda config, updates: saved.append(updates))
+    app = Freya_for_OBS()
+    old_thread = app.voice_thread
+    
+    app.update_audio_settings(['Headset', 'Room mic'])
+    assert saved == [{'devices': ['Headset', 'Room mic']}]
+    assert old_thread.stopped is True
+    assert app.voice_thread is not old_thread
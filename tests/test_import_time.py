@@ -0,0 +1,37 @@
+import os
+import sys
+import subprocess
+import pytest
+
+# Generous enough for a slow CI runner. PySide6 alone is most of it
+IMPORT_BUDGET_US = 1_500_000
+LAZY_MODULES = ['vosk', 'sounddevice', 'pyttsx3', 'simpleobsws', 'numpy', 'settings_window']
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure_imports(module):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+@pytest.fixture(scope='module')
+def import_times():
+    return measure_imports('freya_app')
+
+def test_app_import_within_budget(import_times):
+    assert import_times['freya_app'] < IMPORT_BUDGET_US
+
+@pytest.mark.parametrize('module', LAZY_MODULES)
+def test_heavy_modules_not_loaded_at_startup(import_times, module):
+    assert module not in import_times
+    
+def test_entry_point_does_not_load_multiprocessing():
+    # Only the process decoder backend needs it
+    assert 'multiprocessing' not in measure_imports('main')
@@ -0,0 +1,17 @@
+import sys
+import pytest
+from lazy_import import lazy_import
+
+def test_module_executes_on_first_attribute_access(monkeypatch):
+    monkeypatch.delitem(sys.modules, 'colorsys', raising=False)
+    module = lazy_import('colorsys')
+    assert sys.modules['colorsys'] is module
+    
+    assert module.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    
+def test_already_imported_module_is_returned():
+    assert lazy_import('json') is sys.modules['json']
+    
+def test_missing_module_raises():
+    with pytest.raises(ModuleNotFoundError):
+        lazy_import('not_a_real_module')
@@ -0,0 +1,107 @@
+import os
+import gzip
+import json
+import time
+import logging
+import pytest
+from logging_setup import DailySizeRotatingFileHandler, JsonLinesFormatter, setup_logging, set_log_format, stop_logging
+
+def make_record(msg, level=logging.INFO):
+    return logging.LogRecord('test', level, __file__, 1, msg, None, None)
+
+def write(handler, *messages):
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    for msg in messages:
+        handler.handle(make_record(msg))
+        
+def test_size_rollover_compresses_old_file(tmp_path):
+    path = tmp_path / 'app.log'
+    handler = DailySizeRotatingFileHandler(str(path), max_bytes=64)
+    write(handler, 'a' * 50, 'b' * 50)
+    handler.close()
+    
+    assert path.read_text() == 'b' * 50 + '\n'
+    with gzip.open(f'{path}.1.gz', 'rt') as rolled:
+        assert rolled.read() == 'a' * 50 + '\n'
+        
+def test_restart_appends(tmp_path):
+    path = tmp_path / 'app.log'
+    for msg in ('first run', 'second run'):
+        handler = DailySizeRotatingFileHandler(str(path))
+        write(handler, msg)
+        handler.close()
+    assert path.read_text() == 'first run\nsecond run\n'
+    
+def test_file_from_previous_day_is_rolled(tmp_path):
+    path = tmp_path / 'app.log'
+    path.write_text('yesterday\n')
+    yesterday = time.time() - 86400
+    os.utime(path, (yesterday, yesterday))
+    
+    handler = DailySizeRotatingFileHandler(str(path))
+    write(handler, 'today')
+    handler.close()
+    
+    assert path.read_text() == 'today\n'
+    with gzip.open(f'{path}.1.gz', 'rt') as rolled:
+        assert rolled.read() == 'yesterday\n'
+        
+def test_json_lines_format():
+    entry = json.loads(JsonLinesFormatter().format(make_record('Recording started', logging.WARNING)))
+    assert entry['message'] == 'Recording started'
+    assert entry['level'] == 'WARNING'
+    assert entry['logger'] == 'test'
+    
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    
+def test_setup_logging_writes_through_queue(tmp_path, restore_root_logger):
+    path = tmp_path / 'app.log'
+    listener = setup_logging(str(path), json_lines=True)
+    assert isinstance(logging.getLogger().handlers[0], logging.handlers.QueueHandler)
+    
+    logging.getLogger('voice_recognizer').info('CLIP_PHRASE found')
+    stop_logging(listener)
+    
+    entry = json.loads(path.read_text().splitlines()[-1])
+    assert entry['message'] == 'CLIP_PHRASE found'
+    assert entry['logger'] == 'voice_recognizer'
+    
+@pytest.mark.parametrize('json_lines', [True, False])
+def test_traceback_survives_the_queue(tmp_path, restore_root_logger, json_lines):
+    path = tmp_path / 'app.log'
+    listener = setup_logging(str(path), json_lines=json_lines)
+    try:
+        raise RuntimeError('driver gone')
+    except RuntimeError:
+        logging.getLogger('tts_worker').exception('TTS %s failed', 'say')
+    stop_logging(listener)
+    
+    if json_lines:
+        entry = json.loads(path.read_text().splitlines()[-1])
+        assert entry['message'] == 'TTS say failed'
+        assert 'RuntimeError: driver gone' in entry['exception']
+    else:
+        text = path.read_text()
+        assert 'TTS say failed' in text
+        assert text.count('RuntimeError: driver gone') == 1
+    
+def test_format_applied_after_setup(tmp_path, restore_root_logger):
+    path = tmp_path / 'app.log'
+    listener = setup_logging(str(path))
+    logging.getLogger('yaml_config').warning('Existing config missing or invalid for vad_threshold')
+    set_log_format(listener, json_lines=True)
+    logging.getLogger('voice_recognizer').info('CLIP_PHRASE found')
+    stop_logging(listener)
+    
+    first, second = path.read_text().splitlines()
+    assert 'Existing config missing or invalid' in first
+    assert json.loads(second)['message'] == 'CLIP_PHRASE found'
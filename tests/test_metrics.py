@@ -0,0 +1,56 @@
+import urllib.request
+import pytest
+import metrics
+
+@pytest.fixture
+def hist():
+    hist = metrics.histogram('test_latency_ms', 'Test latency')
+    hist.reset()
+    yield hist
+    hist.reset()
+    
+def test_percentiles_from_buckets(hist):
+    for value in [1.5] * 90 + [150] * 10:
+        hist.observe(value)
+        
+    assert 1 <= hist.percentile(0.5) <= 2
+    assert 1 <= hist.percentile(0.9) <= 2
+    assert 100 <= hist.percentile(0.99) <= 200
+    assert hist.count == 100
+    
+def test_empty_histogram_has_no_percentile(hist):
+    assert hist.percentile(0.5) is None
+    
+def test_histograms_are_shared_by_name_and_labels():
+    first = metrics.histogram('test_obs_ms', 'OBS', request='StartRecord')
+    assert metrics.histogram('test_obs_ms', 'OBS', request='StartRecord') is first
+    assert metrics.histogram('test_obs_ms', 'OBS', request='StopRecord') is not first
+    
+def test_prometheus_text(hist):
+    hist.observe(3)
+    hist.observe(30000)
+    text = metrics.render_prometheus()
+    
+    assert '# TYPE test_latency_ms histogram' in text
+    assert 'test_latency_ms_bucket{le="5"} 1' in text
+    assert 'test_latency_ms_bucket{le="+Inf"} 2' in text
+    assert 'test_latency_ms_count 2' in text
+    
+def test_summary_skips_empty_histograms(hist, caplog):
+    metrics.reset()
+    hist.observe(4)
+    caplog.set_level('INFO')
+    metrics.log_summary()
+    
+    assert 'test_latency_ms n=1 p50=' in caplog.text
+    assert 'test_obs_ms' not in caplog.text
+    
+def test_endpoint_serves_metrics(hist):
+    hist.observe(1)
+    server = metrics.serve(0)
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.server_port}/metrics') as response:
+            body = response.read().decode()
+    finally:
+        server.shutdown()
+    assert 'test_latency_ms_count 1' in body
@@ -0,0 +1,38 @@
+import pytest
+import model_registry
+
+@pytest.fixture(autouse=True)
+def fake_model(monkeypatch):
+    loads = []
+    
+    class FakeModel:
+        def __init__(self, path):
+            if path == 'missing':
+                raise Exception('Failed to create a model')
+            loads.append(path)
+            
+    monkeypatch.setattr(model_registry.vosk, 'Model', FakeModel)
+    model_registry.clear()
+    yield loads
+    model_registry.clear()
+    
+def test_get_model_loads_once_per_path(fake_model):
+    first = model_registry.get_model('model')
+    second = model_registry.get_model('model')
+    
+    assert first is second
+    assert fake_model == ['model']
+    
+def test_swap_model_evicts_other_paths(fake_model):
+    model_registry.get_model('model')
+    model_registry.swap_model('bigger-model')
+    
+    assert model_registry.is_loaded('bigger-model')
+    assert not model_registry.is_loaded('model')
+    
+def test_failed_swap_keeps_current_model():
+    current = model_registry.get_model('model')
+    with pytest.raises(Exception):
+        model_registry.swap_model('missing')
+        
+    assert model_registry.get_model('model') is current
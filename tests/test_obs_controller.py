@@ -1,7 +1,9 @@
 import pytest
 import asyncio
 from simpleobsws import WebSocketClient, Request
-from obs_controller import OBSRecordingController
+import obs_controller
+import metrics
+from obs_controller import OBSRecordingController, request_latency
 
 @pytest.fixture
 def controller():
@@ -20,8 +22,10 @@ def create_ws_and_setup(monkeypatch, controller, fake_call):
     monkeypatch.setattr(controller, 'ws', fake_ws)
     monkeypatch.setattr(controller, 'establish_connection', lambda: asyncio.sleep(0))
     
-def create_fake_call(responses):
+def create_fake_call(responses, calls=None):
     async def fake_call(self, req):
+        if calls is not None:
+            calls.append(req.requestType)
         tup = responses.get(req.requestType, responses.get('default'))
         active, ok = tup
         return FakeResponse(active=active, ok=ok)
@@ -33,13 +37,50 @@ async def test_connect_success(monkeypatch, controller):
         def __init__(self, url, password):
             assert url == 'ws://localhost:4455'
             assert password == 'password'
+        def register_event_callback(self, callback, event): pass
         async def connect(self): pass
-        async def wait_until_identified(self): pass
+        async def wait_until_identified(self): return True
 
-    monkeypatch.setattr('obs_controller.WebSocketClient', DummyWS)
+    monkeypatch.setattr('obs_controller.simpleobsws.WebSocketClient', DummyWS)
     await controller.connect()
     assert isinstance(controller.ws, DummyWS)
     
+@pytest.mark.asyncio
+async def test_reconnect_uses_new_parameters(monkeypatch, controller):
+    urls = []
+    class DummyWS:
+        def __init__(self, url, password):
+            urls.append((url, password))
+        def register_event_callback(self, callback, event): pass
+        async def connect(self): pass
+        async def wait_until_identified(self): return True
+        async def disconnect(self): pass
+
+    monkeypatch.setattr('obs_controller.simpleobsws.WebSocketClient', DummyWS)
+    await controller.connect()
+    await controller.reconnect('127.0.0.1', 4456, 'secret')
+    
+    assert urls == [('ws://localhost:4455', 'password'), ('ws://127.0.0.1:4456', 'secret')]
+    assert controller.port == 4456
+    
+@pytest.mark.asyncio
+async def test_connect_raises_when_obs_rejects_identify(monkeypatch, controller):
+    closed = []
+    class DummyWS:
+        def __init__(self, url, password): pass
+        def register_event_callback(self, callback, event): pass
+        async def connect(self): pass
+        async def wait_until_identified(self): return False
+        async def disconnect(self): closed.append(self)
+
+    monkeypatch.setattr('obs_controller.simpleobsws.WebSocketClient', DummyWS)
+    with pytest.raises(Exception) as exc:
+        await controller.connect()
+    assert 'Check the password' in str(exc.value)
+    assert not controller.link_up.is_set()
+    assert controller.ws is None
+    assert len(closed) == 1
+    
 @pytest.mark.asyncio
 async def test_start_recording_when_recording_inactive(monkeypatch, controller):
     fake_call = create_fake_call({
@@ -273,4 +314,315 @@ async def test_save_replay_buffer_raises_if_stop_fails(monkeypatch, controller,
     with pytest.raises(Exception) as exc:
         await controller.save_replay_buffer()
     assert 'Could not save replay buffer' in str(exc.value)
-    assert 'Failed to save replay buffer' in caplog.text
\ No newline at end of file
+    assert 'Failed to save replay buffer' in caplog.text
+    
+@pytest.mark.asyncio
+async def test_cached_state_skips_status_request(monkeypatch, controller):
+    calls = []
+    fake_call = create_fake_call({'default': (True, True)}, calls)
+    create_ws_and_setup(monkeypatch, controller, fake_call)
+    
+    await controller.on_replay_state_changed({'outputActive': True, 'outputState': 'OBS_WEBSOCKET_OUTPUT_STARTED'})
+    await controller.save_replay_buffer()
+    assert calls == ['SaveReplayBuffer']
+    
+@pytest.mark.asyncio
+async def test_state_is_cached_after_first_query(monkeypatch, controller):
+    calls = []
+    fake_call = create_fake_call({
+        'GetRecordStatus': (False, True),
+        'StartRecord': (True, True),
+        'StopRecord': (False, True),
+    }, calls)
+    create_ws_and_setup(monkeypatch, controller, fake_call)
+    
+    await controller.start_recording()
+    await controller.stop_recording()
+    assert calls == ['GetRecordStatus', 'StartRecord', 'StopRecord']
+    
+@pytest.mark.asyncio
+async def test_cached_state_does_not_expire_while_connected(monkeypatch, controller):
+    calls = []
+    fake_call = create_fake_call({'default': (True, True)}, calls)
+    create_ws_and_setup(monkeypatch, controller, fake_call)
+    
+    # The replay buffer was started long ago and no event has arrived since
+    await controller.on_replay_state_changed({'outputActive': True, 'outputState': 'OBS_WEBSOCKET_OUTPUT_STARTED'})
+    monkeypatch.setattr(obs_controller, 'monotonic', lambda: 10 ** 9)
+    for _ in range(3):
+        await controller.save_replay_buffer()
+    assert calls == ['SaveReplayBuffer'] * 3
+    
+@pytest.mark.asyncio
+async def test_failed_request_drops_cached_state(monkeypatch, controller):
+    calls = []
+    async def fake_call(self, req):
+        calls.append(req.requestType)
+        if req.requestType == 'SaveReplayBuffer':
+            raise asyncio.TimeoutError()
+        return FakeResponse(active=True)
+    create_ws_and_setup(monkeypatch, controller, fake_call)
+    controller.output_state['replay'] = True
+    
+    with pytest.raises(asyncio.TimeoutError):
+        await controller.save_replay_buffer()
+    assert 'replay' not in controller.output_state
+    
+@pytest.mark.asyncio
+async def test_drop_clears_cached_state(controller):
+    controller.output_state['replay'] = True
+    controller.mark_disconnected()
+    assert controller.output_state == {}
+    
+@pytest.mark.asyncio
+async def test_connect_registers_events_and_clears_cache(monkeypatch, controller):
+    events = []
+    class DummyWS:
+        def __init__(self, url, password): pass
+        def register_event_callback(self, callback, event): events.append(event)
+        async def connect(self): pass
+        async def wait_until_identified(self): return True
+
+    monkeypatch.setattr('obs_controller.simpleobsws.WebSocketClient', DummyWS)
+    controller.output_state['record'] = True
+    await controller.connect()
+    
+    assert events == ['RecordStateChanged', 'ReplayBufferStateChanged']
+    assert controller.output_state == {}
+    
+def create_fake_batch(responses, batches):
+    async def fake_call_batch(self, requests, **kwargs):
+        batches.append([req.requestType for req in requests])
+        results = []
+        for req in requests:
+            active, ok = responses.get(req.requestType, responses.get('default'))
+            response = FakeResponse(active=active, ok=ok)
+            response.requestStatus = type('S', (), {'comment': None if ok else 'failed'})()
+            results.append(response)
+        return results
+    return fake_call_batch
+
+def create_batch_ws(monkeypatch, controller, fake_call_batch):
+    fake_ws = type('W', (), {'call_batch': fake_call_batch})()
+    monkeypatch.setattr(controller, 'ws', fake_ws)
+    monkeypatch.setattr(controller, 'establish_connection', lambda: asyncio.sleep(0))
+    
+@pytest.mark.asyncio
+async def test_start_everything_single_batch_with_cached_state(monkeypatch, controller):
+    batches = []
+    create_batch_ws(monkeypatch, controller, create_fake_batch({'default': (True, True)}, batches))
+    await controller.on_record_state_changed({'outputActive': False})
+    await controller.on_replay_state_changed({'outputActive': False})
+    
+    results = await controller.start_everything()
+    assert batches == [['StartRecord', 'StartReplayBuffer']]
+    assert results == {'StartRecord': True, 'StartReplayBuffer': True}
+    assert controller.output_state['record'] is True
+    
+@pytest.mark.asyncio
+async def test_stop_everything_queries_unknown_state_and_skips_inactive(monkeypatch, controller, caplog):
+    batches = []
+    create_batch_ws(monkeypatch, controller, create_fake_batch({
+        'GetRecordStatus': (True, True),
+        'GetReplayBufferStatus': (False, True),
+        'default': (False, True),
+    }, batches))
+    
+    caplog.set_level('WARNING')
+    results = await controller.stop_everything()
+    assert batches == [['GetRecordStatus', 'GetReplayBufferStatus'], ['StopRecord']]
+    assert results == {'StopRecord': True}
+    assert 'Skipping StopReplayBuffer' in caplog.text
+    
+@pytest.mark.asyncio
+async def test_batch_reports_each_failed_request(monkeypatch, controller, caplog):
+    batches = []
+    create_batch_ws(monkeypatch, controller, create_fake_batch({
+        'StartRecord': (True, True),
+        'StartReplayBuffer': (False, False),
+    }, batches))
+    await controller.on_record_state_changed({'outputActive': False})
+    await controller.on_replay_state_changed({'outputActive': False})
+    
+    caplog.set_level('ERROR')
+    with pytest.raises(Exception) as exc:
+        await controller.start_everything()
+    assert 'StartReplayBuffer' in str(exc.value)
+    assert 'StartReplayBuffer failed' in caplog.text
+    assert controller.output_state['record'] is True
+    assert 'replay' not in controller.output_state
+    
+class FlakyWS:
+    # Refuses the first `failures` connection attempts
+    attempts = 0
+    failures = 0
+    
+    def __init__(self, url, password):
+        self.identified = False
+    def register_event_callback(self, callback, event): pass
+    async def connect(self):
+        FlakyWS.attempts += 1
+        if FlakyWS.attempts <= FlakyWS.failures:
+            raise ConnectionRefusedError('OBS not running')
+    async def wait_until_identified(self):
+        self.identified = True
+        return True
+    def is_identified(self):
+        return self.identified
+    async def disconnect(self):
+        self.identified = False
+    async def call(self, request, timeout=15):
+        if not self.identified:
+            raise Exception('Not identified')
+        return FakeResponse()
+    
+@pytest.fixture
+def flaky_ws(monkeypatch):
+    FlakyWS.attempts = 0
+    FlakyWS.failures = 0
+    monkeypatch.setattr('obs_controller.simpleobsws.WebSocketClient', FlakyWS)
+    monkeypatch.setattr(obs_controller, 'RECONNECT_BASE_DELAY', 0.001)
+    monkeypatch.setattr(obs_controller, 'HEALTH_CHECK_INTERVAL', 0.001)
+    return FlakyWS
+    
+@pytest.mark.asyncio
+async def test_supervisor_retries_until_obs_is_up(controller, flaky_ws):
+    flaky_ws.failures = 3
+    controller.start_supervisor()
+    await asyncio.wait_for(controller.link_up.wait(), timeout=1)
+    
+    assert flaky_ws.attempts == 4
+    assert controller.is_connected()
+    await controller.disconnect()
+    assert controller.supervisor is None
+    
+@pytest.mark.asyncio
+async def test_supervisor_reconnects_after_drop(controller, flaky_ws):
+    controller.start_supervisor()
+    await asyncio.wait_for(controller.link_up.wait(), timeout=1)
+    first_ws = controller.ws
+    
+    # OBS closes the socket
+    first_ws.identified = False
+    for _ in range(100):
+        await asyncio.sleep(0.005)
+        if controller.ws is not first_ws and controller.is_connected():
+            break
+    assert controller.ws is not first_ws
+    assert controller.is_connected()
+    await controller.disconnect()
+    
+@pytest.mark.asyncio
+async def test_commands_fail_fast_while_disconnected(monkeypatch, controller):
+    monkeypatch.setattr(obs_controller, 'COMMAND_CONNECT_WAIT', 0.01)
+    controller.supervisor = asyncio.create_task(asyncio.sleep(1))
+    
+    with pytest.raises(Exception) as exc:
+        await controller.save_replay_buffer()
+    assert 'Not connected to OBS' in str(exc.value)
+    controller.stop_supervisor()
+    
+@pytest.mark.asyncio
+async def test_command_is_held_until_link_is_up(controller, flaky_ws, caplog):
+    flaky_ws.failures = 2
+    controller.start_supervisor()
+    
+    caplog.set_level('INFO')
+    await controller.save_replay_buffer()
+    assert 'Replay buffer saved successfully' in caplog.text
+    assert flaky_ws.attempts == 3
+    await controller.disconnect()
+    
+@pytest.mark.asyncio
+async def test_reconnect_keeps_the_supervisor_running(controller, flaky_ws):
+    controller.start_supervisor()
+    await asyncio.wait_for(controller.link_up.wait(), timeout=1)
+    
+    await controller.reconnect('127.0.0.1', 4456, 'secret')
+    assert controller.supervisor is not None and not controller.supervisor.done()
+    await controller.disconnect()
+    
+@pytest.mark.asyncio
+async def test_command_after_drop_waits_for_supervisor(monkeypatch, controller, flaky_ws):
+    monkeypatch.setattr(obs_controller, 'HEALTH_CHECK_INTERVAL', 0.05)
+    controller.start_supervisor()
+    await asyncio.wait_for(controller.link_up.wait(), timeout=1)
+    
+    # Dropped, and the supervisor hasn't noticed yet
+    controller.ws.identified = False
+    await controller.save_replay_buffer()
+    assert controller.is_connected()
+    await controller.disconnect()
+    
+@pytest.mark.asyncio
+async def test_stale_socket_close_is_kept_alive(controller):
+    closed = asyncio.Event()
+    class StaleWS:
+        async def disconnect(self):
+            await asyncio.sleep(0)
+            closed.set()
+    controller.ws = StaleWS()
+    
+    controller.mark_disconnected()
+    assert len(controller.closing) == 1
+    await asyncio.wait_for(closed.wait(), timeout=1)
+    await asyncio.sleep(0)
+    assert not controller.closing
+    
+@pytest.mark.asyncio
+async def test_cancelled_connect_closes_half_open_socket(monkeypatch, controller):
+    identifying = asyncio.Event()
+    closed = []
+    class HangingWS:
+        def __init__(self, url, password): pass
+        def register_event_callback(self, callback, event): pass
+        async def connect(self): pass
+        async def wait_until_identified(self):
+            identifying.set()
+            await asyncio.sleep(10)
+        async def disconnect(self): closed.append(self)
+    monkeypatch.setattr('obs_controller.simpleobsws.WebSocketClient', HangingWS)
+    
+    controller.start_supervisor()
+    await asyncio.wait_for(identifying.wait(), timeout=1)
+    half_open = controller.ws
+    controller.stop_supervisor()
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert controller.ws is None
+    assert closed == [half_open]
+    
+@pytest.mark.asyncio
+async def test_call_requests_sends_one_batch(monkeypatch, controller):
+    batches = []
+    create_batch_ws(monkeypatch, controller, create_fake_batch({'default': (True, True)}, batches))
+    
+    await controller.call_requests([
+        {'requestType': 'SetCurrentProgramScene', 'requestData': {'sceneName': 'Game'}},
+        {'requestType': 'ToggleInputMute', 'requestData': {'inputName': 'Mic'}},
+    ])
+    assert batches == [['SetCurrentProgramScene', 'ToggleInputMute']]
+    
+@pytest.mark.asyncio
+async def test_call_requests_raises_on_failure(monkeypatch, controller, caplog):
+    batches = []
+    create_batch_ws(monkeypatch, controller, create_fake_batch({'default': (False, False)}, batches))
+    
+    caplog.set_level('ERROR')
+    with pytest.raises(Exception) as exc:
+        await controller.call_requests([{'requestType': 'SetCurrentProgramScene'}])
+    assert 'SetCurrentProgramScene' in str(exc.value)
+    assert 'Failed to run custom command' in caplog.text
+    
+@pytest.mark.asyncio
+async def test_requests_record_latency_per_type(monkeypatch, controller):
+    metrics.reset()
+    fake_call = create_fake_call({
+        'GetRecordStatus': (False, True),
+        'StartRecord': (True, True),
+    })
+    create_ws_and_setup(monkeypatch, controller, fake_call)
+    await controller.start_recording()
+    
+    assert request_latency('GetRecordStatus').count == 1
+    assert request_latency('StartRecord').count == 1
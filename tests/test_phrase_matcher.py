@@ -0,0 +1,42 @@
+from enums import Phrases
+from phrase_matcher import PhraseMatcher, phrase_values
+
+def test_finds_every_command_in_one_transcript():
+    matcher = PhraseMatcher.from_phrases(list(Phrases))
+    found = matcher.find('freya start recording and then freya clip that')
+    assert found == [Phrases.START_REC_PHRASE, Phrases.CLIP_PHRASE]
+    
+def test_list_valued_phrases_map_to_one_key():
+    matcher = PhraseMatcher.from_phrases([Phrases.CLIP_PHRASE])
+    assert matcher.find('freya clip it') == [Phrases.CLIP_PHRASE]
+    assert matcher.find('freya clip that') == [Phrases.CLIP_PHRASE]
+    assert matcher.find('freya clip it freya clip that') == [Phrases.CLIP_PHRASE]
+    
+def test_respects_word_boundaries():
+    matcher = PhraseMatcher.from_phrases([Phrases.CLIP_PHRASE])
+    assert matcher.find('freya clip items') == []
+    
+def test_longest_overlapping_phrase_wins():
+    matcher = PhraseMatcher([('freya start', 'short'), ('freya start everything', 'long')])
+    assert matcher.find('freya start everything') == ['long']
+    assert matcher.find('freya start now') == ['short']
+    
+def test_first_added_wins_for_identical_phrases():
+    matcher = PhraseMatcher([('freya clip it', 'first'), ('Freya clip it', 'second')])
+    assert matcher.find('FREYA CLIP IT') == ['first']
+    
+def test_phrase_values_flattens_lists():
+    values = phrase_values([Phrases.START_REC_PHRASE, Phrases.CLIP_PHRASE])
+    assert values == ['freya start recording', 'freya clip it', 'freya clip that']
+    
+def test_remove_prunes_phrase_but_keeps_prefixes():
+    matcher = PhraseMatcher([('freya start', 'short'), ('freya start everything', 'long')])
+    matcher.remove('freya start everything', 'long')
+    
+    assert matcher.find('freya start everything') == ['short']
+    assert matcher.root == {'freya': {'start': {None: (0, 'short')}}}
+    
+def test_remove_ignores_shadowed_duplicate():
+    matcher = PhraseMatcher([('freya clip it', 'builtin'), ('freya clip it', 'custom')])
+    matcher.remove('freya clip it', 'custom')
+    assert matcher.find('freya clip it') == ['builtin']
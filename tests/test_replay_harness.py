@@ -0,0 +1,98 @@
+import json
+import wave
+import pytest
+
+import voice_recognizer as vr
+import model_registry
+from voice_recognizer import VoskVoiceRecognizer
+from replay_harness import FakeOBSController, WavFileStream, read_wav, replay
+from yaml_config import DEFAULT_CONFIG
+
+RATE = 16000
+SPEECH = b'\x01\x00'
+
+@pytest.fixture(autouse=True)
+def keyword_recognizer(monkeypatch):
+    class FakeModel:
+        def __init__(self, path):
+            pass
+        
+    class KeywordRecognizer:
+        # Hears "freya clip it" in any non-silent audio and finalises it on the next silent block
+        def __init__(self, model, rate, grammar=None):
+            self.heard = False
+            self.text = ''
+            
+        def AcceptWaveform(self, data):
+            if SPEECH in data:
+                self.heard = True
+                return False
+            if self.heard:
+                self.heard = False
+                self.text = 'freya clip it'
+                return True
+            self.text = ''
+            return False
+        
+        def Result(self):
+            return json.dumps({'text': self.text})
+        
+        def PartialResult(self):
+            return json.dumps({'partial': ''})
+        
+        def FinalResult(self):
+            text = 'freya clip it' if self.heard else ''
+            self.heard = False
+            return json.dumps({'text': text})
+        
+    monkeypatch.setattr(model_registry.vosk, 'Model', FakeModel)
+    monkeypatch.setattr(vr.vosk, 'KaldiRecognizer', KeywordRecognizer)
+    model_registry.clear()
+    yield
+    model_registry.clear()
+    
+def seconds(value, sample=b'\x00\x00'):
+    return sample * int(value * RATE)
+
+@pytest.mark.asyncio
+async def test_replay_fires_command_after_phrase():
+    recognizer = VoskVoiceRecognizer(FakeOBSController())
+    result = await replay(recognizer, seconds(1) + seconds(0.5, SPEECH) + seconds(1))
+    
+    actions = recognizer.obs_controller.actions
+    assert [action for action, _ in actions] == ['save_replay_buffer']
+    assert actions[0][1] > 1.5
+    assert result.audio_seconds == pytest.approx(3.5)
+    
+@pytest.mark.asyncio
+async def test_max_speed_replay_never_drops_audio():
+    recognizer = VoskVoiceRecognizer(FakeOBSController())
+    # Longer than the ring buffer, so only backpressure keeps it from overflowing
+    await replay(recognizer, seconds(25))
+    assert recognizer.audio_buffer.dropped_bytes == 0
+    
+@pytest.mark.asyncio
+async def test_trailing_phrase_flushed_at_end_of_file():
+    recognizer = VoskVoiceRecognizer(FakeOBSController(), {**DEFAULT_CONFIG, 'block_size': 1600})
+    await replay(recognizer, seconds(1) + seconds(0.5, SPEECH), tail_silence=0)
+    assert [action for action, _ in recognizer.obs_controller.actions] == ['save_replay_buffer']
+    
+def test_realtime_stream_paces_blocks():
+    blocks = []
+    stream = WavFileStream(seconds(0.3), samplerate=RATE, blocksize=1600, realtime=True,
+                           callback=lambda block, frames, time, status: blocks.append(frames))
+    stream.start()
+    assert stream.finished.wait(2)
+    assert blocks == [1600] * 3
+    assert stream.position == pytest.approx(0.3)
+    
+def test_read_wav_rejects_stereo(tmp_path):
+    path = str(tmp_path / 'stereo.wav')
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(bytes(400))
+        
+    with pytest.raises(ValueError):
+        read_wav(path, RATE)
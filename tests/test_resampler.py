@@ -0,0 +1,53 @@
+import numpy as np
+from resampler import StreamResampler
+
+OUT_RATE = 16000
+
+def tone(rate, seconds, frequency, channels=1, amplitude=8000):
+    t = np.arange(int(rate * seconds)) / rate
+    samples = (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+    return np.repeat(samples, channels).tobytes()
+
+def rms(data, skip=100):
+    samples = np.frombuffer(data, dtype=np.int16)[skip:].astype(np.float64)
+    return np.sqrt(np.mean(samples ** 2))
+
+def test_stereo_48k_becomes_16k_mono():
+    resampler = StreamResampler(48000, OUT_RATE, channels=2)
+    out = resampler.process(tone(48000, 1, 440, channels=2))
+    assert len(out) == OUT_RATE * 2
+    
+def test_block_boundaries_do_not_change_output():
+    data = np.frombuffer(tone(44100, 1, 1000), dtype=np.int16)
+    whole = StreamResampler(44100, OUT_RATE).process(data.tobytes())
+    
+    chunked = StreamResampler(44100, OUT_RATE)
+    out = b''.join(chunked.process(data[i:i + 777].tobytes()) for i in range(0, len(data), 777))
+    assert out == whole
+    
+def test_speech_band_passes_at_unity_gain():
+    for rate in (44100, 48000):
+        out = StreamResampler(rate, OUT_RATE, channels=2).process(tone(rate, 1, 1000, channels=2))
+        assert abs(rms(out) - 8000 / np.sqrt(2)) < 50
+        
+def test_tones_above_output_nyquist_are_removed():
+    out = StreamResampler(48000, OUT_RATE).process(tone(48000, 1, 12000))
+    assert rms(out) < 10
+    
+def test_added_delay_is_under_a_millisecond():
+    for rate in (44100, 48000):
+        assert StreamResampler(rate, OUT_RATE).delay / rate < 0.001
+        
+def test_channels_are_averaged():
+    left = np.full(4800, 1000, dtype=np.int16)
+    right = np.full(4800, 3000, dtype=np.int16)
+    stereo = np.column_stack((left, right)).ravel().tobytes()
+    out = np.frombuffer(StreamResampler(48000, OUT_RATE, channels=2).process(stereo), dtype=np.int16)
+    assert np.all(np.abs(out[100:] - 2000) <= 1)
+    
+def test_reset_matches_a_fresh_resampler():
+    data = tone(48000, 0.1, 1000)
+    resampler = StreamResampler(48000, OUT_RATE)
+    resampler.process(tone(48000, 0.05, 3000))
+    resampler.reset()
+    assert resampler.process(data) == StreamResampler(48000, OUT_RATE).process(data)
@@ -1,11 +1,13 @@
 import pytest
-from settings_window import SettingsWindow
+import settings_window
+from settings_window import SettingsWindow, input_devices
 from enums import Options
 from PySide6.QtCore import Qt
 
 @pytest.fixture(autouse=True)
 def disable_get_config(monkeypatch):
     monkeypatch.setattr('settings_window.get_config', lambda: {'notifications': Options.TTS_OPTION.value, 'startup': False})
+    monkeypatch.setattr('settings_window.input_devices', lambda: {'Headset, MME': 'Headset', 'Room mic, MME': 'Room mic', 'Webcam, MME': 'Webcam'})
     
 @pytest.mark.parametrize('notification, startup', [
     (Options.TTS_OPTION.value, False),
@@ -80,4 +82,52 @@ def test_save_obs_settings_emits_and_closes(qtbot):
     assert sig_port == port
     assert sig_pw == pw
 
-    assert not win.isVisible()
\ No newline at end of file
+    assert not win.isVisible()
+    
+def test_audio_tab_lists_devices_and_keeps_missing_selection(monkeypatch, qtbot):
+    config = {'notifications': Options.TTS_OPTION.value, 'startup': False, 'devices': ['Room mic, MME', 'USB mic, WASAPI']}
+    monkeypatch.setattr('settings_window.get_config', lambda: config)
+    win = SettingsWindow()
+    qtbot.addWidget(win)
+    
+    items = [win.device_list.item(index) for index in range(win.device_list.count())]
+    assert [item.text() for item in items] == ['Headset', 'Room mic', 'Webcam', 'USB mic, WASAPI']
+    assert [item.checkState() == Qt.CheckState.Checked for item in items] == [False, True, False, True]
+    
+def test_audio_tab_opens_with_index_from_config(monkeypatch, qtbot):
+    config = {'notifications': Options.TTS_OPTION.value, 'startup': False, 'devices': [3]}
+    monkeypatch.setattr('settings_window.get_config', lambda: config)
+    win = SettingsWindow()
+    qtbot.addWidget(win)
+    
+    item = win.device_list.item(win.device_list.count() - 1)
+    assert item.text() == '3'
+    assert item.checkState() == Qt.CheckState.Checked
+    with qtbot.waitSignal(win.audio_settings_updated, timeout=500) as sig:
+        win.save_audio_settings()
+    assert sig.args == [[3]]
+    
+def test_save_audio_settings_emits_checked_devices(qtbot):
+    win = SettingsWindow()
+    qtbot.addWidget(win)
+    win.device_list.item(0).setCheckState(Qt.CheckState.Checked)
+    win.device_list.item(2).setCheckState(Qt.CheckState.Checked)
+    
+    with qtbot.waitSignal(win.audio_settings_updated, timeout=500) as sig:
+        win.save_audio_settings()
+    assert sig.args == [['Headset, MME', 'Webcam, MME']]
+    assert not win.isVisible()
+    
+def test_input_devices_lists_each_microphone_once(monkeypatch):
+    devices = [
+        {'name': 'Speakers', 'hostapi': 0, 'max_input_channels': 0},
+        {'name': 'Headset', 'hostapi': 0, 'max_input_channels': 1},
+        {'name': 'Headset', 'hostapi': 1, 'max_input_channels': 1},
+        {'name': 'Line in', 'hostapi': 1, 'max_input_channels': 2},
+        {'name': 'Headset', 'hostapi': 2, 'max_input_channels': 1},
+    ]
+    hostapis = [{'name': 'MME'}, {'name': 'Windows WASAPI'}, {'name': 'Windows WDM-KS'}]
+    monkeypatch.setattr(settings_window.sd, 'query_devices', lambda kind=None: {'hostapi': 1} if kind else devices)
+    monkeypatch.setattr(settings_window.sd, 'query_hostapis', lambda: hostapis, raising=False)
+    
+    assert input_devices() == {'Headset, Windows WASAPI': 'Headset', 'Line in, Windows WASAPI': 'Line in'}
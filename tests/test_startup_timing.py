@@ -0,0 +1,47 @@
+import pytest
+import startup_timing
+
+@pytest.fixture(autouse=True)
+def reset_marks():
+    startup_timing.reset()
+    yield
+    startup_timing.reset()
+    
+def test_report_written_after_first_audio_block(caplog):
+    caplog.set_level('INFO')
+    startup_timing.mark('imports')
+    startup_timing.mark('model load', 1.5)
+    assert 'Startup timing' not in caplog.text
+    
+    startup_timing.mark('first audio block')
+    assert 'Startup timing' in caplog.text
+    assert 'model load took 1.50s' in caplog.text
+    assert 'imports at' in caplog.text
+    
+def test_only_first_mark_counts(caplog):
+    caplog.set_level('INFO')
+    startup_timing.mark('first audio block')
+    caplog.clear()
+    
+    startup_timing.mark('first audio block')
+    assert caplog.text == ''
+    
+def test_late_obs_connect_reported_again(caplog):
+    caplog.set_level('INFO')
+    startup_timing.mark('model load', 1.5)
+    startup_timing.mark('first audio block')
+    assert 'OBS connect' not in caplog.text
+    caplog.clear()
+    
+    startup_timing.mark('OBS connect', 0.2)
+    assert 'Startup timing' in caplog.text
+    assert 'OBS connect took 0.20s' in caplog.text
+    
+def test_obs_connect_before_audio_reported_once(caplog):
+    caplog.set_level('INFO')
+    startup_timing.mark('OBS connect', 0.2)
+    assert caplog.text == ''
+    
+    startup_timing.mark('first audio block')
+    assert caplog.text.count('Startup timing') == 1
+    assert 'OBS connect took 0.20s' in caplog.text
@@ -0,0 +1,63 @@
+import os
+import wave
+import pytest
+import tts_cache
+from tts_cache import TTSClipCache
+
+class RenderingEngine:
+    def __init__(self):
+        self.rendered = []
+        self.pending = None
+        
+    def save_to_file(self, text, path):
+        self.pending = (text, path)
+        
+    def runAndWait(self):
+        text, path = self.pending
+        self.rendered.append(text)
+        with wave.open(path, 'wb') as clip:
+            clip.setnchannels(1)
+            clip.setsampwidth(2)
+            clip.setframerate(22050)
+            clip.writeframes(bytes(400))
+
+@pytest.fixture
+def cache(tmp_path):
+    return TTSClipCache(str(tmp_path / 'clips'))
+
+def test_render_then_get(cache):
+    engine = RenderingEngine()
+    assert cache.get('Clipping', 'voice-a', 200) is None
+    
+    path = cache.render(engine, 'Clipping', 'voice-a', 200)
+    assert cache.get('Clipping', 'voice-a', 200) == path
+    assert engine.rendered == ['Clipping']
+    
+def test_voice_and_rate_are_part_of_key(cache):
+    cache.render(RenderingEngine(), 'Clipping', 'voice-a', 200)
+    assert cache.get('Clipping', 'voice-b', 200) is None
+    assert cache.get('Clipping', 'voice-a', 150) is None
+    
+def test_failed_render_leaves_nothing(cache):
+    class SilentEngine(RenderingEngine):
+        def runAndWait(self): pass
+        
+    assert cache.render(SilentEngine(), 'Clipping', 'voice-a', 200) is None
+    assert os.listdir(cache.directory) == []
+    
+def test_prune_removes_stale_clips(cache):
+    engine = RenderingEngine()
+    keep = cache.render(engine, 'Clipping', 'voice-a', 200)
+    cache.render(engine, 'Clipping', 'voice-b', 200)
+    cache.render(engine, 'Old response', 'voice-a', 200)
+    
+    cache.prune([keep])
+    assert os.listdir(cache.directory) == [os.path.basename(keep)]
+    
+def test_play_uses_clip_format(cache, monkeypatch):
+    played = []
+    monkeypatch.setattr(tts_cache.sd, 'play', lambda data, rate: played.append((data.shape, rate)))
+    monkeypatch.setattr(tts_cache.sd, 'wait', lambda: None)
+    
+    cache.play(cache.render(RenderingEngine(), 'Clipping', 'voice-a', 200))
+    assert played == [((200, 1), 22050)]
@@ -0,0 +1,178 @@
+import threading
+import pytest
+import tts_worker
+from tts_worker import TTSWorker
+
+class BlockingEngine:
+    def __init__(self):
+        self.spoken = []
+        self.speaking = threading.Event()
+        self.release = threading.Event()
+        
+    def say(self, msg):
+        self.spoken.append(msg)
+        
+    def runAndWait(self):
+        self.speaking.set()
+        self.release.wait(2)
+        self.speaking.clear()
+        
+    def stop(self):
+        self.release.set()
+
+@pytest.fixture
+def engines(monkeypatch):
+    created = []
+    def init():
+        created.append(BlockingEngine())
+        return created[-1]
+    monkeypatch.setattr(tts_worker.pyttsx3, 'init', init)
+    return created
+
+def test_say_does_not_wait_for_speech(engines):
+    worker = TTSWorker()
+    worker.start()
+    assert worker.say('Recording started')
+    
+    engine_ready = [e for e in engines if e.speaking.wait(2)]
+    assert engine_ready[0].spoken == ['Recording started']
+    engine_ready[0].release.set()
+    worker.stop(timeout=2)
+    assert not worker.is_alive()
+    
+def test_stop_leaves_the_engine_to_the_worker_thread(engines):
+    worker = TTSWorker()
+    worker.start()
+    worker.say('Recording started')
+    engines[0].speaking.wait(2)
+    engines[0].stop = lambda: pytest.fail('engine stopped from another thread')
+    
+    worker.stop(timeout=0.05)
+    assert worker.stopping
+    engines[0].release.set()
+    worker.join(2)
+    assert not worker.is_alive()
+    
+def test_engine_created_once(engines):
+    worker = TTSWorker()
+    worker.start()
+    for msg in ('one', 'two'):
+        worker.say(msg)
+        engines[0].speaking.wait(2)
+        engines[0].release.set()
+    worker.stop(timeout=2)
+    assert len(engines) == 1
+    
+def test_repeated_messages_coalesce():
+    worker = TTSWorker()
+    assert worker.say('Clipping')
+    assert not worker.say('Clipping')
+    assert list(worker.queue) == ['Clipping']
+    
+def test_backlog_drops_oldest():
+    worker = TTSWorker(max_queued=2)
+    for msg in ('one', 'two', 'three'):
+        worker.say(msg)
+    assert list(worker.queue) == ['two', 'three']
+    assert worker.dropped == 1
+    
+def test_failed_engine_is_recreated(engines, monkeypatch):
+    worker = TTSWorker()
+    worker.start()
+    worker.say('first')
+    engines[0].speaking.wait(2)
+    engines[0].runAndWait = lambda: (_ for _ in ()).throw(RuntimeError('driver gone'))
+    engines[0].release.set()
+    
+    worker.say('second')
+    worker.say('third')
+    for _ in range(200):
+        if len(engines) > 1 and engines[1].speaking.is_set():
+            break
+        threading.Event().wait(0.01)
+    engines[1].release.set()
+    worker.stop(timeout=2)
+    assert len(engines) == 2
+    
+class RecordingCache:
+    def __init__(self, cached=()):
+        self.cached = set(cached)
+        self.played = []
+        self.rendered = []
+        self.kept = None
+        
+    def path(self, text, voice, rate): return f'{voice}-{rate}-{text}'
+    def get(self, text, voice, rate): return self.path(text, voice, rate) if text in self.cached else None
+    def play(self, path): self.played.append(path)
+    def stop(self): pass
+    def prune(self, keep): self.kept = list(keep)
+    
+    def render(self, engine, text, voice, rate):
+        self.rendered.append(text)
+        self.cached.add(text)
+        
+class VoiceEngine:
+    def __init__(self): self.spoken = []
+    def getProperty(self, name): return {'voice': 'voice-a', 'rate': 200}[name]
+    def say(self, msg): self.spoken.append(msg)
+    def runAndWait(self): pass
+    def stop(self): pass
+    
+def run_jobs(worker):
+    while worker.queue or worker.renders:
+        action, arg = worker.next_job()
+        {'say': worker.speak, 'render': worker.render, 'prune': worker.prune}[action](arg)
+    
+def test_cached_clip_played_instead_of_speaking():
+    cache = RecordingCache(cached={'Clipping'})
+    worker = TTSWorker(clip_cache=cache)
+    worker.engine = VoiceEngine()
+    
+    worker.say('Clipping')
+    run_jobs(worker)
+    assert cache.played == ['voice-a-200-Clipping']
+    assert worker.engine.spoken == []
+    
+def test_uncached_message_spoken_then_rendered():
+    cache = RecordingCache()
+    worker = TTSWorker(clip_cache=cache)
+    worker.engine = VoiceEngine()
+    
+    worker.say('Starting recording')
+    run_jobs(worker)
+    assert worker.engine.spoken == ['Starting recording']
+    assert cache.rendered == ['Starting recording']
+    
+def test_prerender_renders_missing_and_prunes_rest():
+    cache = RecordingCache(cached={'Clipping'})
+    worker = TTSWorker(clip_cache=cache)
+    worker.engine = VoiceEngine()
+    
+    worker.prerender(['Clipping', 'Starting all', 'Clipping'])
+    run_jobs(worker)
+    assert cache.rendered == ['Starting all']
+    assert cache.kept == ['voice-a-200-Clipping', 'voice-a-200-Starting all']
+    
+class RecordingGate:
+    def __init__(self): self.events = []
+    def hold_audio(self): self.events.append('hold')
+    def release_audio(self): self.events.append('release')
+    
+def test_speech_gate_wraps_speech():
+    worker = TTSWorker()
+    worker.engine = VoiceEngine()
+    worker.speech_gate = RecordingGate()
+    worker.engine.runAndWait = lambda: worker.speech_gate.events.append('speaking')
+    
+    worker.speak('Clipping')
+    assert worker.speech_gate.events == ['hold', 'speaking', 'release']
+    
+def test_speech_gate_released_when_speech_fails():
+    worker = TTSWorker()
+    worker.engine = VoiceEngine()
+    worker.speech_gate = RecordingGate()
+    worker.engine.runAndWait = lambda: 1 / 0
+    
+    with pytest.raises(ZeroDivisionError):
+        worker.speak('Clipping')
+    assert worker.speech_gate.events == ['hold', 'release']
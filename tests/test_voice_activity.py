@@ -0,0 +1,51 @@
+import numpy as np
+from voice_activity import VoiceActivityGate, HANGOVER_MS, PREROLL_MS
+
+RATE = 16000
+
+def silence(ms):
+    return np.zeros(RATE * ms // 1000, dtype=np.int16).tobytes()
+
+def tone(ms, amplitude=3000):
+    t = np.arange(RATE * ms // 1000) / RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.int16).tobytes()
+
+def test_silence_is_skipped():
+    gate = VoiceActivityGate(RATE, 300)
+    data, ended = gate.process(silence(1000))
+    
+    assert data == b''
+    assert not ended
+    assert gate.skipped_fraction == 1.0
+    
+def test_onset_replays_preroll_and_hangover_keeps_gate_open():
+    gate = VoiceActivityGate(RATE, 300)
+    gate.process(silence(1000))
+    
+    speech = tone(200)
+    data, ended = gate.process(speech)
+    assert len(data) == len(silence(PREROLL_MS)) + len(speech)
+    assert not ended
+    
+    data, ended = gate.process(silence(HANGOVER_MS))
+    assert len(data) == len(silence(HANGOVER_MS))
+    assert not ended
+    
+    data, ended = gate.process(silence(100))
+    assert data == b''
+    assert ended
+    
+def test_partial_frames_carry_over():
+    gate = VoiceActivityGate(RATE, 300)
+    speech = tone(100)
+    
+    first, _ = gate.process(speech[:101])
+    second, _ = gate.process(speech[101:])
+    assert first + second == speech
+    
+def test_quiet_noise_stays_gated():
+    gate = VoiceActivityGate(RATE, 300)
+    noise = np.random.default_rng(0).normal(0, 50, RATE).astype(np.int16).tobytes()
+    
+    data, _ = gate.process(noise)
+    assert data == b''
@@ -1,10 +1,14 @@
 import pytest
 import asyncio
 import json
+import threading
 
 import voice_recognizer as vr
-from voice_recognizer import VoskVoiceRecognizer
-from enums import Phrases
+import model_registry
+import metrics
+from voice_recognizer import VoskVoiceRecognizer, build_grammar
+from enums import Phrases, DecodingModes, CustomPhrase
+from yaml_config import DEFAULT_CONFIG
 
 @pytest.fixture(autouse=True)
 def disable_audio_and_model(monkeypatch):
@@ -13,8 +17,11 @@ def disable_audio_and_model(monkeypatch):
             pass
 
     class FakeKaldiRecognizer:
-        def __init__(self, model, rate):
-            pass
+        def __init__(self, model, rate, grammar=None):
+            self.grammar = grammar
+            
+        def SetGrammar(self, grammar):
+            self.grammar = grammar
         
         def AcceptWaveform(self, data):
             return False
@@ -39,10 +46,13 @@ def disable_audio_and_model(monkeypatch):
         def __enter__(self): return self
         def __exit__(self, exc_type, exc, tb): pass
 
-    monkeypatch.setattr(vr, 'Model', FakeModel)
-    monkeypatch.setattr(vr, 'KaldiRecognizer', FakeKaldiRecognizer)
+    monkeypatch.setattr(model_registry.vosk, 'Model', FakeModel)
+    model_registry.clear()
+    monkeypatch.setattr(vr.vosk, 'KaldiRecognizer', FakeKaldiRecognizer)
     monkeypatch.setattr(vr.sd, 'RawInputStream', FakeInputStream)
+    monkeypatch.setattr(vr.sd, 'query_devices', lambda device, kind: {'default_samplerate': 16000.0, 'max_input_channels': 1})
     yield
+    model_registry.clear()
 
 class DummyController:
     def __init__(self):
@@ -55,6 +65,15 @@ class DummyController:
 
     async def disconnect(self):
         self.disconnected = True
+        
+    def start_supervisor(self):
+        self.supervised = True
+        
+    def stop_supervisor(self):
+        self.supervised = False
+        
+    async def call_requests(self, requests):
+        self.actions.extend(request['requestType'] for request in requests)
 
     async def start_recording(self):
         self.actions.append('start_recording')
@@ -70,14 +89,27 @@ class DummyController:
 
     async def save_replay_buffer(self):
         self.actions.append('save_replay')
+        
+    async def start_everything(self):
+        self.actions.append('start_everything')
+        
+    async def stop_everything(self):
+        self.actions.append('stop_everything')
     
-def test_voice_callback_puts_bytes_in_queue():
+@pytest.mark.asyncio
+async def test_voice_callback_writes_into_ring_buffer():
     controller = DummyController()
     recognizer = VoskVoiceRecognizer(controller)
-    sample = b'\x00\x01\x02'
+    recognizer.loop = asyncio.get_running_loop()
+    recognizer.isRunning = True
+    sample = b'\x00\x01\x02\x03'
     recognizer.voice_callback(sample, None, None, None)
+    await asyncio.sleep(0)
 
-    assert recognizer.queue.get_nowait() == sample
+    assert recognizer.data_ready.is_set()
+    arrival, data = recognizer.audio_buffer.read()
+    assert data == sample
+    assert isinstance(arrival, float)
 
 @pytest.mark.asyncio
 async def test_phrase_handler_triggers_commands_and_signal(monkeypatch):
@@ -96,7 +128,7 @@ async def test_phrase_handler_triggers_commands_and_signal(monkeypatch):
 
     # Test multi command
     await recognizer.phrase_handler(Phrases.STOP_EVERYTHING_PHRASE.value)
-    assert controller.actions == ['stop_recording', 'stop_replay']
+    assert controller.actions == ['stop_everything']
     assert emitted == ['Stopping all']
 
 @pytest.mark.asyncio
@@ -127,4 +159,516 @@ async def test_stop_cleans_queue_and_stream(monkeypatch):
     await recognizer.stop()
     assert recognizer.isRunning is False
     assert recognizer.audio_stream is None
-    assert recognizer.queue.get_nowait() is None
\ No newline at end of file
+    assert recognizer.stopping
+    assert recognizer.data_ready.is_set()
+    
+def test_build_grammar_includes_every_phrase_and_unk():
+    grammar = json.loads(build_grammar(list(Phrases)))
+    
+    for phrase in Phrases:
+        values = phrase.value if isinstance(phrase.value, list) else [phrase.value]
+        for value in values:
+            assert value in grammar
+    assert grammar[-1] == '[unk]'
+
+def test_open_decoding_has_no_grammar():
+    recognizer = VoskVoiceRecognizer(DummyController())
+    recognizer.load_model()
+    assert recognizer.grammar is None
+    assert recognizer.recognizer.grammar is None
+
+def test_grammar_decoding_rebuilds_on_phrase_change():
+    config = {**DEFAULT_CONFIG, 'decoding': DecodingModes.GRAMMAR_MODE.value}
+    recognizer = VoskVoiceRecognizer(DummyController(), config)
+    recognizer.load_model()
+    assert 'freya clip that' in json.loads(recognizer.recognizer.grammar)
+    
+    recognizer.update_phrases([Phrases.CLIP_PHRASE])
+    # Grammar changes are queued on the decoder thread
+    recognizer.executor.submit(lambda: None).result()
+    grammar = json.loads(recognizer.recognizer.grammar)
+    assert grammar == ['freya clip it', 'freya clip that', '[unk]']
+    
+class ScriptedRecognizer:
+    def __init__(self, steps):
+        # Each step is (is_final, text)
+        self.steps = list(steps)
+        self.current = (False, '')
+        
+    def AcceptWaveform(self, data):
+        self.current = self.steps.pop(0)
+        return self.current[0]
+    
+    def Result(self):
+        return json.dumps({'text': self.current[1]})
+    
+    def PartialResult(self):
+        return json.dumps({'partial': self.current[1]})
+
+async def run_blocks(recognizer, count, block=b'\x00\x00'):
+    recognizer.loop = asyncio.get_running_loop()
+    recognizer.isRunning = True
+    consumer = asyncio.create_task(recognizer.process_audio())
+    for _ in range(count):
+        recognizer.voice_callback(block, None, None, None)
+        # Let the consumer drain each block like it would in real time
+        await asyncio.sleep(0.01)
+    recognizer.wake()
+    await consumer
+    
+@pytest.mark.asyncio
+async def test_partial_results_fire_once_per_utterance():
+    controller = DummyController()
+    config = {**DEFAULT_CONFIG, 'partial_results': True}
+    recognizer = VoskVoiceRecognizer(controller, config)
+    recognizer.recognizer = ScriptedRecognizer([
+        (False, 'freya clip'),
+        (False, 'freya clip it'),
+        (False, 'freya clip it now'),
+        (True, 'freya clip it now'),
+    ])
+    
+    await run_blocks(recognizer, 4)
+    assert controller.actions == ['save_replay']
+    assert recognizer.last_latency is not None
+    assert recognizer.fired_phrases == set()
+    
+@pytest.mark.asyncio
+async def test_partial_results_disabled_waits_for_final():
+    controller = DummyController()
+    recognizer = VoskVoiceRecognizer(controller)
+    recognizer.recognizer = ScriptedRecognizer([
+        (False, 'freya clip it'),
+        (True, 'freya clip it'),
+    ])
+    
+    await run_blocks(recognizer, 2)
+    assert controller.actions == ['save_replay']
+    
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_while_waiting_for_audio():
+    recognizer = VoskVoiceRecognizer(DummyController())
+    recognizer.isRunning = True
+    consumer = asyncio.create_task(recognizer.process_audio())
+    
+    # Other coroutines keep running while the consumer waits on the queue
+    await asyncio.wait_for(asyncio.sleep(0.01), timeout=0.05)
+    assert not consumer.done()
+    
+    recognizer.wake()
+    await asyncio.wait_for(consumer, timeout=0.1)
+    
+@pytest.mark.asyncio
+async def test_adaptive_blocks_batch_silence_and_stream_speech():
+    config = {**DEFAULT_CONFIG, 'adaptive_blocks': True, 'block_size': 4, 'speech_block_size': 2}
+    recognizer = VoskVoiceRecognizer(DummyController(), config)
+    recognizer.loop = asyncio.get_running_loop()
+    recognizer.isRunning = True
+    
+    # Silence accumulates until a full block is buffered
+    recognizer.voice_callback(b'\x00' * 4, None, None, None)
+    await asyncio.sleep(0)
+    assert not recognizer.data_ready.is_set()
+    recognizer.voice_callback(b'\x00' * 4, None, None, None)
+    await asyncio.sleep(0)
+    assert recognizer.data_ready.is_set()
+    
+    recognizer.audio_buffer.read()
+    recognizer.data_ready.clear()
+    recognizer.speech_active = True
+    recognizer.voice_callback(b'\x00' * 4, None, None, None)
+    await asyncio.sleep(0)
+    assert recognizer.data_ready.is_set()
+    
+@pytest.mark.parametrize('device, expected', [
+    ('', 7),
+    ('3', 3),
+    ('USB Mic', 'USB Mic'),
+])
+def test_resolve_device(monkeypatch, device, expected):
+    monkeypatch.setattr(vr.sd.default, 'device', [7, 1], raising=False)
+    recognizer = VoskVoiceRecognizer(DummyController(), {**DEFAULT_CONFIG, 'device': device})
+    assert recognizer.resolve_device() == expected
+    
+@pytest.mark.asyncio
+async def test_vad_gate_skips_silent_blocks():
+    recognizer = VoskVoiceRecognizer(DummyController(), {**DEFAULT_CONFIG, 'vad': True})
+    decoded = []
+    recognizer.decode = lambda data, flush=False: decoded.append(data) or (False, '')
+    
+    await run_blocks(recognizer, 3, block=bytes(3200))
+    assert decoded == []
+    assert recognizer.vad_gate.skipped_fraction == 1.0
+    
+def test_recognizers_share_the_loaded_model():
+    first = VoskVoiceRecognizer(DummyController())
+    second = VoskVoiceRecognizer(DummyController())
+    first.load_model()
+    second.load_model()
+    assert first.model is second.model
+    
+def test_set_model_path_swaps_model_and_recognizer():
+    recognizer = VoskVoiceRecognizer(DummyController())
+    recognizer.load_model()
+    old_model, old_recognizer = recognizer.model, recognizer.recognizer
+    
+    recognizer.set_model_path('./other-model').result()
+    assert recognizer.model is not old_model
+    assert recognizer.recognizer is not old_recognizer
+    assert not model_registry.is_loaded(vr.VOSK_MODEL_PATH)
+    
+def test_set_model_path_waits_for_decode_in_flight():
+    recognizer = VoskVoiceRecognizer(DummyController())
+    recognizer.load_model()
+    old_recognizer = recognizer.recognizer
+    decoding = threading.Event()
+    finish = threading.Event()
+    def slow_decode():
+        decoding.set()
+        finish.wait(1)
+        return recognizer.recognizer
+    
+    in_flight = recognizer.executor.submit(slow_decode)
+    decoding.wait(1)
+    swapped = recognizer.set_model_path('./other-model')
+    assert recognizer.recognizer is old_recognizer
+    finish.set()
+    
+    assert in_flight.result() is old_recognizer
+    swapped.result()
+    assert recognizer.recognizer is not old_recognizer
+    
+def test_model_is_not_loaded_on_construction():
+    recognizer = VoskVoiceRecognizer(DummyController())
+    assert recognizer.model is None
+    assert not model_registry.is_loaded(vr.VOSK_MODEL_PATH)
+    
+@pytest.mark.asyncio
+async def test_start_opens_audio_without_waiting_for_obs():
+    controller = DummyController()
+    recognizer = VoskVoiceRecognizer(controller)
+    ready = []
+    recognizer.ready.connect(lambda: ready.append(True))
+    
+    task = asyncio.create_task(recognizer.start())
+    await asyncio.sleep(0.05)
+    assert recognizer.model is not None
+    assert recognizer.audio_stream.active
+    assert controller.supervised
+    assert not controller.connected
+    assert ready == [True]
+    
+    await recognizer.stop()
+    await asyncio.wait_for(task, timeout=0.1)
+    
+@pytest.mark.asyncio
+async def test_command_actions_run_concurrently():
+    recognizer = VoskVoiceRecognizer(DummyController())
+    running = []
+    
+    async def action(name):
+        running.append(name)
+        await asyncio.sleep(0.01)
+        # Both actions have started before either finishes
+        assert len(running) == 2
+    
+    recognizer.commands[Phrases.START_EVERYTHING_PHRASE] = (
+        'Starting all', [lambda: action('record'), lambda: action('replay')]
+    )
+    await recognizer.phrase_handler(Phrases.START_EVERYTHING_PHRASE.value)
+    assert running == ['record', 'replay']
+    
+@pytest.mark.asyncio
+async def test_failed_command_does_not_stop_recognition():
+    controller = DummyController()
+    async def fail():
+        raise Exception('Not connected to OBS')
+    controller.save_replay_buffer = fail
+    
+    recognizer = VoskVoiceRecognizer(controller)
+    recognizer.recognizer = ScriptedRecognizer([
+        (True, 'freya clip it'),
+        (True, 'freya start recording'),
+    ])
+    await run_blocks(recognizer, 2)
+    assert controller.actions == ['start_recording']
+    
+@pytest.mark.asyncio
+async def test_audio_ignored_while_notification_plays(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(vr, 'perf_counter', lambda: clock[0])
+    recognizer = VoskVoiceRecognizer(DummyController(), {**DEFAULT_CONFIG, 'tts_tail_ms': 500})
+    recognizer.loop = asyncio.get_running_loop()
+    recognizer.isRunning = True
+    
+    recognizer.hold_audio()
+    recognizer.voice_callback(b'\x01\x00', None, None, None)
+    recognizer.release_audio()
+    clock[0] += 0.4
+    recognizer.voice_callback(b'\x02\x00', None, None, None)
+    assert len(recognizer.audio_buffer) == 0
+    assert recognizer.muted_bytes == 4
+    
+    clock[0] += 0.2
+    recognizer.voice_callback(b'\x03\x00', None, None, None)
+    assert recognizer.audio_buffer.read()[1] == b'\x03\x00'
+    
+@pytest.mark.asyncio
+async def test_command_cooldown(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(vr, 'perf_counter', lambda: clock[0])
+    controller = DummyController()
+    recognizer = VoskVoiceRecognizer(controller, {**DEFAULT_CONFIG, 'command_cooldown_ms': 1000})
+    
+    await recognizer.phrase_handler('freya clip it')
+    clock[0] += 0.5
+    await recognizer.phrase_handler('freya clip it')
+    await recognizer.phrase_handler('freya start recording')
+    assert controller.actions == ['save_replay', 'start_recording']
+    
+    clock[0] += 0.6
+    await recognizer.phrase_handler('freya clip it')
+    assert controller.actions == ['save_replay', 'start_recording', 'save_replay']
+    
+SCENE_COMMAND = {
+    'response': 'Switching scene',
+    'requests': [{'requestType': 'SetCurrentProgramScene', 'requestData': {'sceneName': 'Gameplay'}}],
+}
+
+@pytest.mark.asyncio
+async def test_custom_commands_run_their_requests():
+    controller = DummyController()
+    recognizer = VoskVoiceRecognizer(controller)
+    emitted = []
+    recognizer.command_successful.connect(lambda msg: emitted.append(msg))
+    
+    recognizer.update_custom_commands({'freya switch scene': SCENE_COMMAND})
+    await recognizer.phrase_handler('freya switch scene')
+    assert controller.actions == ['SetCurrentProgramScene']
+    assert emitted == ['Switching scene']
+    
+def test_custom_command_reload_only_touches_changed_phrases():
+    config = {**DEFAULT_CONFIG, 'decoding': DecodingModes.GRAMMAR_MODE.value}
+    recognizer = VoskVoiceRecognizer(DummyController(), config)
+    recognizer.load_model()
+    recognizer.update_custom_commands({'freya switch scene': SCENE_COMMAND, 'freya mute mic': SCENE_COMMAND})
+    grammar = recognizer.grammar
+    assert 'freya mute mic' in json.loads(grammar)
+    
+    # Changing only the requests keeps the phrase set, matcher and grammar as they are
+    changed = {**SCENE_COMMAND, 'response': 'Scene switched'}
+    recognizer.update_custom_commands({'freya switch scene': changed, 'freya mute mic': SCENE_COMMAND})
+    assert recognizer.grammar is grammar
+    assert recognizer.commands[CustomPhrase('CUSTOM "freya switch scene"', 'freya switch scene')][0] == 'Scene switched'
+    
+    recognizer.update_custom_commands({'freya switch scene': changed})
+    assert recognizer.matcher.find('freya mute mic') == []
+    assert 'freya mute mic' not in json.loads(recognizer.grammar)
+    assert recognizer.matcher.find('freya clip it') == [Phrases.CLIP_PHRASE]
+    
+@pytest.mark.asyncio
+async def test_watch_commands_hot_reloads_file(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(vr, 'COMMANDS_POLL_INTERVAL', 0.01)
+    recognizer = VoskVoiceRecognizer(DummyController())
+    watcher = asyncio.create_task(recognizer.watch_commands())
+    
+    (tmp_path / 'commands.yaml').write_text(
+        'freya switch scene:\n'
+        '  requests:\n'
+        '    - requestType: SetCurrentProgramScene\n'
+    )
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if recognizer.matcher.find('freya switch scene'):
+            break
+    watcher.cancel()
+    assert recognizer.matcher.find('freya switch scene')[0].value == 'freya switch scene'
+    
+@pytest.mark.asyncio
+async def test_responses_sent_once_commands_are_loaded(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(vr, 'COMMANDS_POLL_INTERVAL', 0.01)
+    recognizer = VoskVoiceRecognizer(DummyController())
+    sent = []
+    recognizer.responses_changed.connect(sent.append)
+    watcher = asyncio.create_task(recognizer.watch_commands())
+    
+    # No commands.yaml still counts as loaded
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if sent:
+            break
+    assert 'Starting recording' in sent[0]
+    
+    (tmp_path / 'commands.yaml').write_text(
+        'freya switch scene:\n'
+        '  response: Switching scene\n'
+        '  requests:\n'
+        '    - requestType: SetCurrentProgramScene\n'
+    )
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if len(sent) > 1:
+            break
+    watcher.cancel()
+    assert 'Switching scene' in sent[-1]
+    
+@pytest.mark.asyncio
+async def test_pipeline_records_timing_metrics():
+    metrics.reset()
+    recognizer = VoskVoiceRecognizer(DummyController())
+    recognizer.recognizer = ScriptedRecognizer([(True, 'freya clip it')])
+    await run_blocks(recognizer, 1)
+    
+    for hist in (vr.CALLBACK_TIME, vr.QUEUE_WAIT, vr.QUEUE_DEPTH, vr.DECODE_TIME, vr.MATCH_TIME):
+        assert hist.count == 1, hist.name
+    
+MULTI_DEVICE_CONFIG = {**DEFAULT_CONFIG, 'devices': ['Headset', 'Room mic']}
+
+@pytest.mark.asyncio
+async def test_each_device_gets_a_stream_and_recognizer_on_one_model():
+    recognizer = VoskVoiceRecognizer(DummyController(), MULTI_DEVICE_CONFIG)
+    listener = recognizer.listeners[0]
+    assert (recognizer.device, listener.device) == ('Headset', 'Room mic')
+    
+    task = asyncio.create_task(recognizer.start())
+    await asyncio.sleep(0.05)
+    assert recognizer.audio_stream.active and listener.audio_stream.active
+    assert listener.recognizer is not recognizer.recognizer
+    assert listener.model is recognizer.model
+    assert listener.executor is not recognizer.executor
+    
+    await recognizer.stop()
+    await asyncio.wait_for(task, timeout=0.1)
+    assert listener.audio_stream is None
+    
+@pytest.mark.asyncio
+async def test_phrase_heard_on_two_devices_fires_once():
+    controller = DummyController()
+    recognizer = VoskVoiceRecognizer(controller, MULTI_DEVICE_CONFIG)
+    listener = recognizer.listeners[0]
+    recognizer.recognizer = ScriptedRecognizer([(True, 'freya clip it')])
+    listener.recognizer = ScriptedRecognizer([(True, 'freya clip it'), (True, 'freya start recording')])
+    
+    consumers = []
+    for source in (recognizer, listener):
+        source.loop = asyncio.get_running_loop()
+        source.isRunning = True
+        consumers.append(asyncio.create_task(source.process_audio()))
+    for source in (recognizer, listener, listener):
+        source.voice_callback(b'\x00\x00', None, None, None)
+        await asyncio.sleep(0.01)
+    recognizer.wake()
+    await asyncio.gather(*consumers)
+    
+    assert controller.actions == ['save_replay', 'start_recording']
+    
+@pytest.mark.asyncio
+async def test_missing_secondary_device_does_not_stop_primary(monkeypatch):
+    opened = []
+    real_stream = vr.sd.RawInputStream
+    def open_stream(*, device, **kwargs):
+        if device == 'Room mic':
+            raise Exception('Device unavailable')
+        opened.append(device)
+        return real_stream(device=device, **kwargs)
+    monkeypatch.setattr(vr.sd, 'RawInputStream', open_stream)
+    
+    recognizer = VoskVoiceRecognizer(DummyController(), MULTI_DEVICE_CONFIG)
+    task = asyncio.create_task(recognizer.start())
+    await asyncio.sleep(0.05)
+    assert opened == ['Headset']
+    assert recognizer.isRunning and not recognizer.listeners[0].isRunning
+    
+    await recognizer.stop()
+    await asyncio.wait_for(task, timeout=0.1)
+    
+@pytest.mark.asyncio
+async def test_stop_closes_every_decoder_and_disconnects():
+    controller = DummyController()
+    controller.supervised = True
+    recognizer = VoskVoiceRecognizer(controller, {**DEFAULT_CONFIG, 'devices': ['Headset', 'Room mic', 'Webcam']})
+    closed = []
+    for source in [recognizer, *recognizer.listeners]:
+        source.close_recognizer = lambda device=source.device: closed.append(device)
+        
+    await recognizer.stop()
+    assert sorted(closed) == ['Headset', 'Room mic', 'Webcam']
+    assert controller.disconnected
+    assert not controller.supervised
+    
+def test_grammar_changes_reach_every_device():
+    config = {**MULTI_DEVICE_CONFIG, 'decoding': DecodingModes.GRAMMAR_MODE.value}
+    recognizer = VoskVoiceRecognizer(DummyController(), config)
+    recognizer.load_model()
+    listener = recognizer.listeners[0]
+    listener.load_model()
+    
+    recognizer.update_custom_commands({'freya switch scene': SCENE_COMMAND})
+    assert 'freya switch scene' in json.loads(listener.grammar)
+    
+def test_device_opens_at_native_rate_and_audio_is_resampled(monkeypatch):
+    opened = {}
+    real_stream = vr.sd.RawInputStream
+    def open_stream(**kwargs):
+        opened.update(kwargs)
+        return real_stream(**kwargs)
+    monkeypatch.setattr(vr.sd, 'RawInputStream', open_stream)
+    monkeypatch.setattr(vr.sd, 'query_devices', lambda device, kind: {'default_samplerate': 48000.0, 'max_input_channels': 2})
+    
+    recognizer = VoskVoiceRecognizer(DummyController(), {**DEFAULT_CONFIG, 'device': '1'})
+    recognizer.open_stream()
+    assert opened['samplerate'] == 48000
+    assert opened['channels'] == 2
+    assert opened['blocksize'] == recognizer.block_size * 3
+    
+    recognizer.isRunning = True
+    recognizer.loop = asyncio.new_event_loop()
+    # The callback only copies, resampling happens when the consumer reads
+    recognizer.voice_callback(bytes(4800 * 2 * 2), 4800, None, None)
+    assert len(recognizer.audio_buffer) == 4800 * 2 * 2
+    _, data = recognizer.read_audio()
+    assert len(data) == 1600 * 2
+    recognizer.loop.close()
+    
+def test_resampler_restarts_after_muted_audio(monkeypatch):
+    monkeypatch.setattr(vr.sd, 'query_devices', lambda device, kind: {'default_samplerate': 48000.0, 'max_input_channels': 1})
+    recognizer = VoskVoiceRecognizer(DummyController())
+    recognizer.open_stream()
+    recognizer.isRunning = True
+    recognizer.loop = asyncio.new_event_loop()
+    resets = []
+    monkeypatch.setattr(recognizer.resampler, 'reset', lambda: resets.append(True))
+    
+    recognizer.voice_callback(bytes(4800 * 2), 4800, None, None)
+    recognizer.read_audio()
+    assert resets == []
+    
+    recognizer.hold_audio()
+    recognizer.voice_callback(bytes(4800 * 2), 4800, None, None)
+    recognizer.speech_playing = False
+    recognizer.voice_callback(bytes(4800 * 2), 4800, None, None)
+    recognizer.read_audio()
+    assert resets == [True]
+    recognizer.loop.close()
+    
+def test_native_capture_can_be_turned_off(monkeypatch):
+    opened = {}
+    real_stream = vr.sd.RawInputStream
+    def open_stream(**kwargs):
+        opened.update(kwargs)
+        return real_stream(**kwargs)
+    monkeypatch.setattr(vr.sd, 'RawInputStream', open_stream)
+    monkeypatch.setattr(vr.sd, 'query_devices', lambda device, kind: {'default_samplerate': 48000.0, 'max_input_channels': 2})
+    
+    recognizer = VoskVoiceRecognizer(DummyController(), {**DEFAULT_CONFIG, 'device': '1', 'native_capture': False})
+    recognizer.open_stream()
+    assert opened['samplerate'] == 16000
+    assert opened['channels'] == 1
+    assert recognizer.resampler is None
+    
+def test_numeric_device_from_yaml_is_an_index():
+    recognizer = VoskVoiceRecognizer(DummyController(), {**DEFAULT_CONFIG, 'devices': [3, 'Room mic, MME']})
+    assert recognizer.resolve_device() == 3
+    assert recognizer.listeners[0].resolve_device() == 'Room mic, MME'
@@ -1,4 +1,5 @@
 import asyncio
+import concurrent.futures
 import pytest
 from voice_thread import VoiceRecognizerThread
 from PySide6.QtWidgets import QWidget
@@ -14,6 +15,9 @@ class DummyRecognizer:
     async def stop(self):
         self.stop_called = True
         
+    def wake(self):
+        self.woken = True
+        
 class DummyLoop:
     def __init__(self, loop_running=True):
         self.loop_running = loop_running
@@ -62,6 +66,12 @@ def test_req_stop_sets_flag(thread):
     thread.req_stop()
     assert thread.voice_recognizer.isRunning is False
     
+def test_req_stop_wakes_running_loop(thread):
+    loop = DummyLoop(loop_running=True)
+    thread.exec_loop = loop
+    thread.req_stop()
+    assert loop.soon_calls == [thread.voice_recognizer.wake]
+    
 def test_on_completion_success(thread):
     fut = make_future(result=None)
     loop = DummyLoop(loop_running=True)
@@ -70,7 +80,25 @@ def test_on_completion_success(thread):
 
     assert thread.voice_recognizer.isRunning is False
     assert any(isinstance(t, asyncio.Future) for t in loop.created_tasks)
-    assert loop.stopped or any(call == loop.stop for call in loop.soon_calls)
+    # The loop keeps running until stop() has finished
+    assert not loop.stopped
+    
+def test_loop_outlives_every_await_in_stop(thread):
+    steps = []
+    async def stop():
+        for step in ('decoders closed', 'obs disconnected'):
+            await asyncio.sleep(0)
+            steps.append(step)
+    thread.voice_recognizer.stop = stop
+    
+    loop = asyncio.new_event_loop()
+    thread.exec_loop = loop
+    task = loop.create_task(thread.voice_recognizer.start())
+    task.add_done_callback(thread.on_completion)
+    loop.run_forever()
+    loop.close()
+    
+    assert steps == ['decoders closed', 'obs disconnected']
     
 def test_on_completion_failure_emits_error_and_stops(qtbot, thread):
     exc = RuntimeError('Connection failed')
@@ -83,7 +111,7 @@ def test_on_completion_failure_emits_error_and_stops(qtbot, thread):
     thread.on_completion(fut)
     
     assert len(captured) == 1
-    assert 'Could not connect to OBS' in captured[0]
+    assert 'Voice recognition stopped' in captured[0]
 
     assert loop.stopped
     
@@ -97,4 +125,14 @@ def test_run_creates_and_closes_loop(monkeypatch, thread):
     thread.run()
 
     assert isinstance(thread.exec_loop, DummyLoop)
-    assert thread.exec_loop.loop_running is False
\ No newline at end of file
+    assert thread.exec_loop.loop_running is False
+    
+def test_on_reconnect_failure_emits_error(thread):
+    captured = []
+    thread.error_occured.connect(lambda msg: captured.append(msg))
+    
+    future = concurrent.futures.Future()
+    future.set_exception(RuntimeError('Connection refused'))
+    thread.on_reconnect(future)
+    assert len(captured) == 1
+    assert 'Could not connect to OBS' in captured[0]
@@ -12,9 +12,14 @@ def backup_and_restore_config():
         backup_file = f"{FILE_NAME}.bak"
         shutil.copy(FILE_NAME, backup_file)
         os.remove(FILE_NAME)
+    defaults = dict(DEFAULT_CONFIG)
 
     yield
 
+    flush_config()
+    # save_config updates the dict it is given in place, DEFAULT_CONFIG included
+    DEFAULT_CONFIG.clear()
+    DEFAULT_CONFIG.update(defaults)
     if os.path.exists(FILE_NAME):
         os.remove(FILE_NAME)
     if backup_file and os.path.exists(backup_file):
@@ -77,4 +82,132 @@ def test_load_config_invalid_values_triggers_regeneration(caplog):
     with caplog.at_level('WARNING'):
         result = load_config()
         assert result == DEFAULT_CONFIG
-        assert 'invalid' in caplog.text.lower()
\ No newline at end of file
+        assert 'invalid' in caplog.text.lower()
+    
+def test_load_config_keeps_settings_from_older_versions():
+    baseline = {
+        'host': '192.168.1.5',
+        'port': 4455,
+        'password': 'hunter2',
+        'notifications': 'Sound',
+        'startup': True
+    }
+    with open(FILE_NAME, 'w') as f:
+        yaml.dump(baseline, f)
+        
+    result = load_config()
+    assert result == {**DEFAULT_CONFIG, **baseline}
+    with open(FILE_NAME) as f:
+        assert yaml.safe_load(f) == result
+        
+def test_load_config_replaces_only_mistyped_values(caplog):
+    with open(FILE_NAME, 'w') as f:
+        yaml.dump({**DEFAULT_CONFIG, 'host': 'obs.local', 'vad_threshold': 300.5}, f)
+        
+    with caplog.at_level('WARNING'):
+        result = load_config()
+    assert result['vad_threshold'] == DEFAULT_CONFIG['vad_threshold']
+    assert result['host'] == 'obs.local'
+    assert 'vad_threshold' in caplog.text
+    
+def test_load_config_accepts_device_indices(caplog):
+    with open(FILE_NAME, 'w') as f:
+        yaml.dump({**DEFAULT_CONFIG, 'device': 3, 'devices': [3, 'Room mic, MME']}, f)
+        
+    with caplog.at_level('WARNING'):
+        result = load_config()
+    assert result['device'] == 3
+    assert result['devices'] == [3, 'Room mic, MME']
+    assert 'invalid' not in caplog.text.lower()
+    
+def test_load_config_replaces_bad_device_entries():
+    with open(FILE_NAME, 'w') as f:
+        yaml.dump({**DEFAULT_CONFIG, 'device': True, 'devices': [['Headset']]}, f)
+        
+    result = load_config()
+    assert result['device'] == DEFAULT_CONFIG['device']
+    assert result['devices'] == DEFAULT_CONFIG['devices']
+    
+def test_get_config_fills_missing_keys_in_external_change():
+    load_config()
+    with open(FILE_NAME, 'w') as f:
+        yaml.dump({'host': 'obs.local', 'port': 4455, 'password': 'secret'}, f)
+    os.utime(FILE_NAME, ns=(0, 0))
+    
+    result = get_config()
+    assert result['host'] == 'obs.local'
+    assert result['block_size'] == DEFAULT_CONFIG['block_size']
+    
+def test_get_config_served_from_memory(monkeypatch):
+    load_config()
+    monkeypatch.setattr('yaml_config.yaml.safe_load', lambda file: pytest.fail('config re-read'))
+    
+    assert get_config()['host'] == DEFAULT_CONFIG['host']
+    
+def test_get_config_reloads_when_file_changes():
+    load_config()
+    with open(FILE_NAME, 'w') as f:
+        yaml.dump({**DEFAULT_CONFIG, 'host': 'obs.local'}, f)
+    os.utime(FILE_NAME, ns=(0, 0))
+    
+    assert get_config()['host'] == 'obs.local'
+    
+def test_get_config_ignores_invalid_external_change(caplog):
+    load_config()
+    with open(FILE_NAME, 'w') as f:
+        f.write('host: [broken')
+    os.utime(FILE_NAME, ns=(0, 0))
+    
+    with caplog.at_level('WARNING'):
+        assert get_config()['host'] == DEFAULT_CONFIG['host']
+    
+def test_save_config_debounces_writes(monkeypatch):
+    monkeypatch.setattr('yaml_config.SAVE_DEBOUNCE', 0.05)
+    config = load_config()
+    writes = []
+    real_write = write_config
+    monkeypatch.setattr('yaml_config.write_config', lambda config: (writes.append(dict(config)), real_write(config)))
+    
+    for startup in (True, False, True):
+        save_config(config, {'startup': startup})
+    assert get_config()['startup'] is True
+    assert writes == []
+    
+    flush_config()
+    assert len(writes) == 1
+    with open(FILE_NAME) as f:
+        assert yaml.safe_load(f)['startup'] is True
+        
+def test_load_config_sees_pending_save():
+    config = load_config()
+    save_config(config, {'devices': ['Headset']})
+    assert load_config()['devices'] == ['Headset']
+    
+def test_write_config_leaves_no_temp_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_config(dict(DEFAULT_CONFIG))
+    assert os.listdir(tmp_path) == [FILE_NAME]
+    
+@pytest.fixture
+def commands_file(monkeypatch, tmp_path):
+    path = tmp_path / 'commands.yaml'
+    monkeypatch.setattr('yaml_config.COMMANDS_FILE_NAME', str(path))
+    return path
+    
+def test_load_commands_missing_file_is_empty(commands_file):
+    assert load_commands() == {}
+    
+def test_load_commands_skips_invalid_entries(commands_file, caplog):
+    commands_file.write_text(yaml.dump({
+        'Freya Switch Scene': {'requests': [{'requestType': 'SetCurrentProgramScene', 'requestData': {'sceneName': 'Game'}}]},
+        'freya broken': {'requests': [{'requestData': {}}]},
+        'freya empty': {'requests': []},
+    }))
+    with caplog.at_level('WARNING'):
+        commands = load_commands()
+    assert list(commands) == ['freya switch scene']
+    assert 'freya broken' in caplog.text
+    
+def test_load_commands_unparsable_returns_none(commands_file):
+    commands_file.write_text('freya: [unclosed')
+    assert load_commands() is None
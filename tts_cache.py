@@ -0,0 +1,66 @@
+import os
+import wave
+import logging
+import hashlib
+from lazy_import import lazy_import
+
+np = lazy_import('numpy')
+sd = lazy_import('sounddevice')
+
+CACHE_DIR = 'tts_cache'
+SAMPLE_DTYPES = {1: 'uint8', 2: 'int16', 4: 'int32'}
+
+class TTSClipCache:
+    # Notification phrases rendered to WAV once per voice and rate, so speaking them is just playback
+    def __init__(self, directory=CACHE_DIR):
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory
+
+    def path(self, text, voice, rate):
+        key = hashlib.sha1(f'{voice}\0{rate}\0{text}'.encode()).hexdigest()
+        return os.path.join(self.directory, f'{key}.wav')
+
+    def get(self, text, voice, rate):
+        path = self.path(text, voice, rate)
+        return path if os.path.exists(path) else None
+
+    def render(self, engine, text, voice, rate):
+        # Rendered under a temporary name so a half-written clip is never played
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(text, voice, rate)
+        temp_path = f'{path[:-4]}.tmp.wav'
+        try:
+            engine.save_to_file(text, temp_path)
+            engine.runAndWait()
+            with wave.open(temp_path, 'rb') as clip:
+                if not clip.getnframes():
+                    raise ValueError('empty clip')
+            os.replace(temp_path, path)
+        except Exception as e:
+            self.logger.warning(f'Could not cache speech for {text!r}: {e}')
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return None
+        return path
+
+    def prune(self, keep):
+        # Clips for old voices, rates or phrases aren't reachable any more
+        if not os.path.isdir(self.directory):
+            return
+        keep = {os.path.normcase(os.path.abspath(path)) for path in keep}
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.wav') and os.path.normcase(os.path.abspath(path)) not in keep:
+                os.remove(path)
+
+    def play(self, path):
+        with wave.open(path, 'rb') as clip:
+            frames = clip.readframes(clip.getnframes())
+            data = np.frombuffer(frames, dtype=SAMPLE_DTYPES[clip.getsampwidth()])
+            data = data.reshape(-1, clip.getnchannels())
+            sample_rate = clip.getframerate()
+        sd.play(data, sample_rate)
+        sd.wait()
+
+    def stop(self):
+        sd.stop()
@@ -0,0 +1,144 @@
+import logging
+import threading
+import startup_timing
+from collections import deque
+from time import perf_counter
+from lazy_import import lazy_import
+
+pyttsx3 = lazy_import('pyttsx3')
+
+# Notifications are only useful while they're current, so a backlog beyond this drops the oldest
+MAX_QUEUED = 3
+
+class TTSWorker(threading.Thread):
+    # Owns the only pyttsx3 engine. It is created on this thread and every utterance runs here,
+    # so say() returns immediately and the GUI thread never waits on speech
+    def __init__(self, max_queued=MAX_QUEUED, clip_cache=None):
+        super().__init__(name='TTSWorker', daemon=True)
+        self.logger = logging.getLogger(__name__)
+        self.queue = deque()
+        # Clip rendering only runs while nothing is waiting to be spoken
+        self.renders = deque()
+        self.clip_cache = clip_cache
+        # Told when speech starts and stops so the recognizer can ignore what the mic hears of it
+        self.speech_gate = None
+        self.max_queued = max_queued
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.speaking = None
+        self.engine = None
+        self.dropped = 0
+
+    def say(self, msg):
+        with self.condition:
+            if self.stopping:
+                return False
+            # The same message already waiting or being spoken says nothing new
+            if msg == self.speaking or msg in self.queue:
+                self.logger.debug(f'Coalesced repeated notification: {msg}')
+                return False
+            if len(self.queue) >= self.max_queued:
+                dropped = self.queue.popleft()
+                self.dropped += 1
+                self.logger.warning(f'Speech backed up. Dropped notification: {dropped}')
+            self.queue.append(msg)
+            self.condition.notify()
+        return True
+
+    def prerender(self, texts):
+        if not self.clip_cache:
+            return
+        texts = list(dict.fromkeys(texts))
+        with self.condition:
+            self.renders.clear()
+            self.renders.extend(('render', text) for text in texts)
+            self.renders.append(('prune', texts))
+            self.condition.notify()
+
+    def stop(self, timeout=None):
+        with self.condition:
+            self.stopping = True
+            self.queue.clear()
+            self.renders.clear()
+            self.condition.notify()
+        if self.clip_cache:
+            self.clip_cache.stop()
+        # The engine is only touched from the worker thread (SAPI5 is COM). An utterance in progress
+        # finishes on its own, and join gives up after timeout since this is a daemon thread
+        if self.is_alive():
+            self.join(timeout)
+
+    def init_engine(self):
+        started = perf_counter()
+        try:
+            self.engine = pyttsx3.init()
+            startup_timing.mark('TTS init', perf_counter() - started)
+        except Exception as e:
+            self.logger.error(f'Could not initialize TTS engine: {e}')
+
+    def next_job(self):
+        with self.condition:
+            while not self.queue and not self.renders and not self.stopping:
+                self.condition.wait()
+            if self.stopping:
+                return None
+            if self.queue:
+                self.speaking = self.queue.popleft()
+                return 'say', self.speaking
+            return self.renders.popleft()
+
+    def voice(self):
+        return self.engine.getProperty('voice'), self.engine.getProperty('rate')
+
+    def speak(self, msg):
+        gate = self.speech_gate
+        if gate:
+            gate.hold_audio()
+        try:
+            self.play_or_say(msg)
+        finally:
+            if gate:
+                gate.release_audio()
+
+    def play_or_say(self, msg):
+        if self.clip_cache:
+            clip = self.clip_cache.get(msg, *self.voice())
+            if clip:
+                try:
+                    self.clip_cache.play(clip)
+                    return
+                except Exception as e:
+                    self.logger.warning(f'Could not play cached speech, speaking instead: {e}')
+        
+        self.engine.say(msg)
+        self.engine.runAndWait()
+        if self.clip_cache:
+            with self.condition:
+                self.renders.append(('render', msg))
+
+    def render(self, text):
+        voice = self.voice()
+        if not self.clip_cache.get(text, *voice):
+            self.clip_cache.render(self.engine, text, *voice)
+
+    def prune(self, texts):
+        voice = self.voice()
+        self.clip_cache.prune(self.clip_cache.path(text, *voice) for text in texts)
+
+    def run(self):
+        self.init_engine()
+        handlers = {'say': self.speak, 'render': self.render, 'prune': self.prune}
+        while (job := self.next_job()) is not None:
+            action, arg = job
+            if self.engine is None:
+                self.init_engine()
+            try:
+                if self.engine:
+                    handlers[action](arg)
+            except Exception as e:
+                # A wedged driver gets a fresh engine on the next message
+                self.logger.error(f'TTS {action} failed: {e}')
+                self.engine = None
+            finally:
+                with self.condition:
+                    self.speaking = None
@@ -0,0 +1,74 @@
+from collections import deque
+from lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+FRAME_MS = 10
+HANGOVER_MS = 500
+PREROLL_MS = 300
+ZCR_THRESHOLD = 0.25
+
+class VoiceActivityGate:
+    # Decides per 10 ms frame whether audio is worth decoding. Frames stay open for HANGOVER_MS after
+    # the last voiced frame, and the PREROLL_MS before an onset is replayed so first words aren't clipped
+    def __init__(self, sample_rate, threshold):
+        self.frame_size = sample_rate * FRAME_MS // 1000
+        self.frame_bytes = self.frame_size * 2
+        self.threshold = threshold
+        self.hangover_frames = HANGOVER_MS // FRAME_MS
+        self.preroll = deque(maxlen=PREROLL_MS // FRAME_MS)
+
+        self.remainder = b''
+        self.hangover = 0
+        self.active = False
+        self.total_bytes = 0
+        self.skipped_bytes = 0
+
+    @property
+    def skipped_fraction(self):
+        if not self.total_bytes:
+            return 0.0
+        return self.skipped_bytes / self.total_bytes
+
+    def voiced_frames(self, data):
+        frames = np.frombuffer(data, dtype=np.int16).reshape(-1, self.frame_size).astype(np.float32)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        # Zero-crossings catch unvoiced consonants that are quieter than vowels
+        zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+        return (rms >= self.threshold) | ((rms >= self.threshold / 2) & (zcr >= ZCR_THRESHOLD))
+
+    def process(self, data):
+        # Returns (audio to decode, whether speech just ended)
+        data = self.remainder + data
+        usable = len(data) - len(data) % self.frame_bytes
+        self.remainder = data[usable:]
+        if not usable:
+            return b'', False
+
+        voiced = self.voiced_frames(data[:usable])
+        output = []
+        ended = False
+        for index, is_voiced in enumerate(voiced):
+            frame = data[index * self.frame_bytes:(index + 1) * self.frame_bytes]
+            keep = is_voiced or self.hangover > 0
+            if is_voiced:
+                self.hangover = self.hangover_frames
+            elif self.hangover:
+                self.hangover -= 1
+
+            if keep:
+                if not self.active:
+                    self.active = True
+                    self.skipped_bytes -= len(self.preroll) * self.frame_bytes
+                    output.extend(self.preroll)
+                    self.preroll.clear()
+                output.append(frame)
+            else:
+                if self.active:
+                    self.active = False
+                    ended = True
+                self.preroll.append(frame)
+                self.skipped_bytes += self.frame_bytes
+
+        self.total_bytes += usable
+        return b''.join(output), ended
@@ -1,35 +1,117 @@
 import logging
 import json
-import sounddevice as sd
-from queue import Queue, Empty
-from vosk import Model, KaldiRecognizer
+import asyncio
+import os
+from functools import partial
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+from lazy_import import lazy_import
 from rel_path import resource_path
-from enums import Phrases
+from audio_buffer import AudioRingBuffer
+from voice_activity import VoiceActivityGate
+from resampler import StreamResampler
+from model_registry import get_model, swap_model
+from phrase_matcher import PhraseMatcher, phrase_values
+import startup_timing
+import metrics
+from enums import Phrases, DecodingModes, DecoderBackends, CustomPhrase
+from yaml_config import DEFAULT_CONFIG, COMMANDS_FILE_NAME, load_commands
 
 from PySide6.QtCore import QObject, Signal
 
+# Both are only needed once the voice thread starts decoding
+sd = lazy_import('sounddevice')
+vosk = lazy_import('vosk')
+
 VOSK_MODEL_PATH = resource_path('./model')          
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+BLOCK_SIZE = 8000
+SPEECH_BLOCK_SIZE = 1600
+VAD_THRESHOLD = 300
+TTS_TAIL_MS = 300
+COMMAND_COOLDOWN_MS = 1500
+BUFFER_SECONDS = 10
+UNKNOWN_TOKEN = '[unk]'
+COMMANDS_POLL_INTERVAL = 1
+CLIP_RESPONSE = 'Clipping'
+METRICS_LOG_INTERVAL = 300
+
+CALLBACK_TIME = metrics.histogram('freya_audio_callback_ms', 'Time from audio callback entry to the block being enqueued')
+QUEUE_WAIT = metrics.histogram('freya_queue_wait_ms', 'Age of the newest buffered audio when the decoder picks it up')
+QUEUE_DEPTH = metrics.histogram('freya_queue_depth_ms', 'Audio waiting in the ring buffer when the decoder reads it')
+DECODE_TIME = metrics.histogram('freya_accept_waveform_ms', 'Vosk AcceptWaveform duration')
+MATCH_TIME = metrics.histogram('freya_phrase_match_ms', 'Time to match a transcript against the command phrases')
+
+def build_grammar(phrases):
+    # Vosk only decodes against these strings; [unk] absorbs everything else
+    return json.dumps(sorted(set(phrase_values(phrases))) + [UNKNOWN_TOKEN])
 
 class VoskVoiceRecognizer(QObject):
     command_successful = Signal(str)
+    ready = Signal()
+    # Every notification text once commands.yaml has been read, for the TTS clip cache
+    responses_changed = Signal(list)
     
-    def __init__(self, obs_controller):
+    def __init__(self, obs_controller, config=DEFAULT_CONFIG, device=None, parent=None):
         super().__init__()
         self.logger = logging.getLogger(__name__)
+        # Extra microphones get their own stream, buffer and recognizer but hand every transcript to
+        # the parent, which owns the commands, cooldowns and OBS connection
+        self.parent = parent
+        self.owner = parent or self
         
-        self.queue = Queue()
+        self.sample_rate = config.get('sample_rate', SAMPLE_RATE)
+        self.block_size = config.get('block_size', BLOCK_SIZE)
+        self.speech_block_size = config.get('speech_block_size', SPEECH_BLOCK_SIZE)
+        self.adaptive_blocks = config.get('adaptive_blocks', False)
+        # Capture at the device's own rate and channels and convert here, rather than leaving it to the host API
+        self.native_capture = config.get('native_capture', True)
+        self.resampler = None
+        self.devices = config.get('devices') or [config.get('device', '')]
+        self.device = self.devices[0] if device is None else device
+        # Set by the decoder while Vosk holds a non-empty hypothesis
+        self.speech_active = False
+        # Our own notifications play through the speakers, so the mic is ignored while they do plus a short tail
+        self.tts_tail = config.get('tts_tail_ms', TTS_TAIL_MS) / 1000
+        self.speech_playing = False
+        self.muted_until = 0
+        self.muted_bytes = 0
+        self.command_cooldown = config.get('command_cooldown_ms', COMMAND_COOLDOWN_MS) / 1000
+        self.last_fired = {}
+        
+        self.audio_buffer = AudioRingBuffer(self.sample_rate * SAMPLE_WIDTH * BUFFER_SECONDS, SAMPLE_WIDTH)
+        # Bytes per second and per full block as the device delivers them, before any resampling
+        self.capture_rate = self.sample_rate * SAMPLE_WIDTH
+        self.capture_block = self.block_size * SAMPLE_WIDTH
+        # Set by the callback while muted so the consumer restarts the resampler instead of filtering across the gap
+        self.capture_gap = False
+        self.vad_gate = None
+        if config.get('vad', False):
+            self.vad_gate = VoiceActivityGate(self.sample_rate, config.get('vad_threshold', VAD_THRESHOLD))
+        self.data_ready = asyncio.Event()
+        self.stopping = False
+        self.reported_drops = 0
+        self.loop = None
+        # Single worker keeps blocks in order and the recognizer single-threaded
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='vosk-decoder')
         self.isRunning = False
         
-        try:
-            self.model = Model(VOSK_MODEL_PATH)
-            self.logger.info(f'Loaded Vosk model from {VOSK_MODEL_PATH}')
-        except Exception as e:
-            self.logger.error(f'Failed to load Vosk model: {e}')
-            raise
+        # The model is loaded by start() on the voice thread so the tray never waits on it
+        self.model_path = VOSK_MODEL_PATH
+        self.model = None
+        self.recognizer = None
             
         self.audio_stream = None
-        self.recognizer = KaldiRecognizer(self.model, 16000)
         self.obs_controller = obs_controller
+        self.decoding = config.get('decoding', DecodingModes.OPEN_MODE.value)
+        self.decoder_backend = config.get('decoder_backend', DecoderBackends.THREAD_BACKEND.value)
+        self.grammar = None
+        self.partial_results = config.get('partial_results', False)
+        # Phrases already fired from partial hypotheses of the current utterance
+        self.fired_phrases = set()
+        self.block_arrival = None
+        self.last_latency = None
         
         self.commands = {
             Phrases.START_REC_PHRASE: (
@@ -50,98 +132,432 @@ class VoskVoiceRecognizer(QObject):
             ),
             Phrases.START_EVERYTHING_PHRASE: (
                 'Starting all', 
-                [lambda: self.obs_controller.start_recording(),
-                lambda: self.obs_controller.start_replay_buffer()]
+                [lambda: self.obs_controller.start_everything()]
             ),
             Phrases.STOP_EVERYTHING_PHRASE: (
                 'Stopping all', 
-                [lambda: self.obs_controller.stop_recording(),
-                lambda: self.obs_controller.stop_replay_buffer()]
+                [lambda: self.obs_controller.stop_everything()]
             ),
         }
+        self.phrases = list(self.commands) + [Phrases.CLIP_PHRASE]
+        self.matcher = PhraseMatcher.from_phrases(self.phrases)
+        # Never a real mtime, so the first poll loads the file even when it doesn't exist
+        self.commands_mtime = -1
+        self.command_watcher = None
+        self.metrics_log_interval = config.get('metrics_log_interval', METRICS_LOG_INTERVAL)
+        self.metrics_reporter = None
+        
+        self.listeners = []
+        self.listener_tasks = []
+        if parent is None:
+            self.listeners = [
+                VoskVoiceRecognizer(obs_controller, config, device=extra, parent=self) for extra in self.devices[1:]
+            ]
+        
+    def load_model(self):
+        started = perf_counter()
+        try:
+            # The decoder process loads its own copy, this process never needs one
+            if not self.uses_process_backend():
+                self.model = get_model(self.model_path)
+            self.recognizer = self.create_recognizer()
+        except Exception as e:
+            self.logger.error(f'Failed to load Vosk model: {e}')
+            raise
+        startup_timing.mark('model load', perf_counter() - started)
+        
+    def uses_process_backend(self):
+        return self.decoder_backend == DecoderBackends.PROCESS_BACKEND.value
+        
+    def create_recognizer(self):
+        if self.decoding == DecodingModes.GRAMMAR_MODE.value:
+            self.grammar = build_grammar(self.phrases)
+            self.logger.info(f'Using command grammar: {self.grammar}')
+        else:
+            self.grammar = None
+            self.logger.info('Using open vocabulary decoding')
+        
+        if self.uses_process_backend():
+            # Only needed for this backend, and multiprocessing is slow to import
+            from decoder_process import ProcessDecoder
+            self.logger.info('Decoding in a separate process')
+            # A second of headroom over the ring for the samples the resampler carries between reads
+            capacity = self.sample_rate * SAMPLE_WIDTH * (BUFFER_SECONDS + 1)
+            return ProcessDecoder(self.model_path, self.sample_rate, self.grammar, capacity)
+        if self.grammar:
+            return vosk.KaldiRecognizer(self.model, self.sample_rate, self.grammar)
+        return vosk.KaldiRecognizer(self.model, self.sample_rate)
+    
+    def close_recognizer(self):
+        # Only the process backend holds anything (a child process and shared memory) that needs releasing
+        close = getattr(self.recognizer, 'close', None)
+        if close:
+            close()
+    
+    def set_model_path(self, path):
+        if path == self.model_path:
+            return
+        
+        self.logger.info(f'Swapping Vosk model to {path}')
+        self.model_path = path
+        for listener in self.listeners:
+            listener.set_model_path(path)
+        if self.recognizer is None:
+            return None
+        # Queued behind any in-flight decode, like SetGrammar, so the recognizer isn't replaced or closed under it
+        return self.executor.submit(self.swap_recognizer, path)
+        
+    def swap_recognizer(self, path):
+        if self.uses_process_backend():
+            self.close_recognizer()
+        else:
+            self.model = swap_model(path)
+        # Recognizers are bound to their model, so the old one can't be reused
+        self.recognizer = self.create_recognizer()
+        
+    def update_phrases(self, phrases):
+        self.phrases = list(phrases)
+        self.matcher = PhraseMatcher.from_phrases(self.phrases)
+        self.update_grammar()
+        
+    def update_grammar(self):
+        if self.decoding != DecodingModes.GRAMMAR_MODE.value:
+            return
+        
+        grammar = build_grammar(self.phrases)
+        if self.recognizer and grammar != self.grammar:
+            self.logger.info('Phrase set changed. Rebuilding command grammar')
+            self.grammar = grammar
+            # Queued behind any in-flight decode so the recognizer is never touched from two threads
+            self.executor.submit(self.recognizer.SetGrammar, grammar)
+        for listener in self.listeners:
+            listener.phrases = self.phrases
+            listener.update_grammar()
+            
+    def update_custom_commands(self, catalogue):
+        custom = {}
+        for phrase, command in catalogue.items():
+            key = CustomPhrase(f'CUSTOM "{phrase}"', phrase)
+            custom[key] = (command.get('response', phrase), [partial(self.obs_controller.call_requests, command['requests'])])
+        
+        old_keys = {key for key in self.commands if isinstance(key, CustomPhrase)}
+        removed = old_keys - set(custom)
+        added = set(custom) - old_keys
+        
+        # Build the new table aside and swap it in with one assignment. Nothing awaits in between
+        commands = {key: value for key, value in self.commands.items() if not isinstance(key, CustomPhrase)}
+        commands.update(custom)
+        self.commands = commands
+        self.phrases = [phrase for phrase in self.phrases if not isinstance(phrase, CustomPhrase)] + list(custom)
+        
+        # Only phrases that came or went touch the matcher and grammar
+        for key in removed:
+            self.matcher.remove(key.value, key)
+        for key in added:
+            self.matcher.add(key.value, key)
+        if removed or added:
+            self.update_grammar()
+        self.logger.info(f'Loaded {len(custom)} custom commands ({len(added)} added, {len(removed)} removed)')
+        self.responses_changed.emit(self.responses())
+        
+    async def report_metrics(self):
+        while True:
+            await asyncio.sleep(self.metrics_log_interval)
+            metrics.log_summary()
+            
+    def responses(self):
+        return [CLIP_RESPONSE] + [response for response, _ in self.commands.values()]
+        
+    async def watch_commands(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                mtime = os.stat(COMMANDS_FILE_NAME).st_mtime_ns if os.path.exists(COMMANDS_FILE_NAME) else None
+                if mtime != self.commands_mtime:
+                    self.commands_mtime = mtime
+                    catalogue = await loop.run_in_executor(None, load_commands)
+                    if catalogue is not None:
+                        self.update_custom_commands(catalogue)
+            except Exception as e:
+                self.logger.error(f'Could not reload {COMMANDS_FILE_NAME}: {e}')
+            await asyncio.sleep(COMMANDS_POLL_INTERVAL)
+        
+    def decode(self, data, flush=False):
+        # Runs on the decoder thread so the event loop stays free for OBS I/O
+        accepted = False
+        if data:
+            started = perf_counter()
+            accepted = self.recognizer.AcceptWaveform(data)
+            DECODE_TIME.observe((perf_counter() - started) * 1000)
+        if accepted:
+            self.speech_active = False
+            result = json.loads(self.recognizer.Result())
+            return True, result.get('text', '').lower()
+        if flush:
+            # The gate stopped feeding audio, so Vosk would never see the trailing silence it needs
+            self.speech_active = False
+            result = json.loads(self.recognizer.FinalResult())
+            return True, result.get('text', '').lower()
+        if self.partial_results or self.adaptive_blocks:
+            result = json.loads(self.recognizer.PartialResult())
+            text = result.get('partial', '').lower()
+            self.speech_active = bool(text)
+            if self.partial_results:
+                return False, text
+        return False, ''
         
     async def process_audio(self):
+        loop = asyncio.get_running_loop()
         while self.isRunning:
             try:
-                data = self.queue.get(timeout=0.1)
-                if data is None:
-                    break
+                await self.data_ready.wait()
+                self.data_ready.clear()
                 
-                if self.recognizer.AcceptWaveform(data):
-                    result = json.loads(self.recognizer.Result())
-                    text = result.get('text', '').lower()
-                    await self.phrase_handler(text)
-            except Empty:
-                continue                                               
+                # Take everything the callback wrote since the last pass in one read
+                self.block_arrival, data = self.read_audio()
+                flush = False
+                if data:
+                    startup_timing.mark('first audio block')
+                    QUEUE_WAIT.observe((perf_counter() - self.block_arrival) * 1000)
+                    QUEUE_DEPTH.observe(len(data) / SAMPLE_WIDTH / self.sample_rate * 1000)
+                    self.report_drops()
+                if data and self.vad_gate:
+                    data, flush = self.vad_gate.process(data)
+                    
+                if data or flush:
+                    is_final, text = await loop.run_in_executor(self.executor, self.decode, data, flush)
+                    if is_final:
+                        await self.owner.phrase_handler(text, skip=self.fired_phrases, source=self)
+                        self.fired_phrases = set()
+                    elif text:
+                        fired = await self.owner.phrase_handler(text, skip=self.fired_phrases, source=self)
+                        self.fired_phrases.update(fired)
+                
+                if self.stopping:
+                    break
             except Exception as e:
                 self.logger.error(f'Could not process audio: {e}')
                 break 
+        if self.vad_gate:
+            self.logger.info(f'Voice activity gate skipped {self.vad_gate.skipped_fraction:.1%} of audio')
         self.logger.info('Ceased audio processing')
+        
+    def read_audio(self):
+        arrival, data = self.audio_buffer.read()
+        if data and self.resampler:
+            if self.capture_gap:
+                self.capture_gap = False
+                self.resampler.reset()
+            data = self.resampler.process(data)
+        return arrival, data
+        
+    def report_drops(self):
+        dropped = self.audio_buffer.dropped_bytes
+        if dropped != self.reported_drops:
+            seconds = (dropped - self.reported_drops) / self.capture_rate
+            self.logger.warning(f'Decoder fell behind. Dropped {seconds:.2f} s of audio ({self.audio_buffer.overflows} overflows total)')
+            self.reported_drops = dropped
+        
+    def find_phrases(self, text):
+        started = perf_counter()
+        found = self.matcher.find(text)
+        MATCH_TIME.observe((perf_counter() - started) * 1000)
+        return found
+    
+    def log_latency(self, phrase_key, source=None):
+        source = source or self
+        if source.block_arrival is None:
+            return
+        self.last_latency = (perf_counter() - source.block_arrival) * 1000
+        device = f' from device {source.device}' if self.listeners else ''
+        self.logger.info(f'{phrase_key.name} dispatched {self.last_latency:.1f} ms after audio arrival{device}')
            
-    async def phrase_handler(self, text):
+    async def phrase_handler(self, text, skip=(), source=None):
         # if text: 
         #     self.logger.info(f'Recognized: {text}')
         
-        if any(phrase in text for phrase in Phrases.CLIP_PHRASE.value):
-            self.logger.info('CLIP_PHRASE found')
+        found = [phrase_key for phrase_key in self.find_phrases(text) if phrase_key not in skip]
+        now = perf_counter()
+        for phrase_key in found:
+            # However many hypotheses or microphones one utterance shows up in, the action only fires once per cooldown
+            last = self.last_fired.get(phrase_key)
+            if last is not None and now - last < self.command_cooldown:
+                self.logger.info(f'{phrase_key.name} ignored, already fired {(now - last) * 1000:.0f} ms ago')
+                continue
+            self.last_fired[phrase_key] = now
+            self.logger.info(f'{phrase_key.name} found')
+            self.log_latency(phrase_key, source)
+            
+            # A failed command is logged rather than raised so an OBS hiccup never stops recognition
+            if phrase_key is Phrases.CLIP_PHRASE:
+                try:
+                    await self.obs_controller.save_replay_buffer()
+                    self.command_successful.emit(CLIP_RESPONSE)
+                except Exception as e:
+                    self.logger.error(f'{phrase_key.name} failed: {e}')
+                continue
+            
+            # Actions within a command are independent, so they run concurrently
+            response, phrase_commands = self.commands[phrase_key]
             try:
-                await self.obs_controller.save_replay_buffer()
-                self.command_successful.emit('Clipping')
+                await asyncio.gather(*(func() for func in phrase_commands))
+                self.command_successful.emit(response)
             except Exception as e:
-                raise
-        else:
-            # If not a multi phrase command, run through here
-            for phrase_key, (response, phrase_commands) in self.commands.items():
-                if phrase_key.value in text:
-                    signal_emitted = False
-                    self.logger.info(f'{phrase_key.name} found')
-                    for func in phrase_commands:
-                        try:
-                            await func()
-                            if not signal_emitted:
-                                self.command_successful.emit(response)
-                                signal_emitted = True
-                        except Exception as e:
-                            raise
+                self.logger.error(f'{phrase_key.name} failed: {e}')
+        return found
                     
     def voice_callback(self, indata, frames, time, status):
         if status:
             self.logger.warning(f'Audio status: {status}')
-        self.queue.put(bytes(indata))
+        if not self.isRunning or self.loop is None:
+            return
+        if self.is_muted():
+            self.muted_bytes += len(indata)
+            self.capture_gap = True
+            return
+        # Called from the PortAudio thread. Copy into the preallocated ring and wake the event loop
+        started = perf_counter()
+        self.audio_buffer.write(indata)
+        # Small blocks only reach the decoder while someone is talking
+        if not self.adaptive_blocks or self.speech_active or len(self.audio_buffer) >= self.capture_block:
+            self.loop.call_soon_threadsafe(self.data_ready.set)
+        CALLBACK_TIME.observe((perf_counter() - started) * 1000)
+        
+    def hold_audio(self):
+        # Called from the TTS thread when a notification starts playing
+        self.speech_playing = True
+        
+    def release_audio(self):
+        self.muted_until = perf_counter() + self.tts_tail
+        self.speech_playing = False
+        
+    def is_muted(self):
+        if self.parent:
+            return self.parent.is_muted()
+        return self.speech_playing or perf_counter() < self.muted_until
+        
+    def resolve_device(self):
+        if self.device == '':
+            return sd.default.device[0]
+        # Indices may be written in config.yaml as numbers or strings
+        if isinstance(self.device, int) or self.device.isdigit():
+            return int(self.device)
+        # sounddevice matches on a substring of the device name
+        return self.device
+        
+    def wake(self):
+        self.stopping = True
+        self.data_ready.set()
+        for listener in self.listeners:
+            listener.wake()
+            
+    def open_stream(self):
+        device = self.resolve_device()
+        blocksize = self.speech_block_size if self.adaptive_blocks else self.block_size
+        rate, channels = self.sample_rate, 1
+        self.resampler = None
+        if self.native_capture:
+            info = sd.query_devices(device, 'input')
+            rate = int(info['default_samplerate'])
+            # Mono or stereo covers every real microphone, more channels are usually a mixer's loopbacks
+            channels = max(1, min(int(info['max_input_channels']), 2))
+            if rate != self.sample_rate or channels != 1:
+                self.resampler = StreamResampler(rate, self.sample_rate, channels)
+                # Same block duration at the device rate
+                blocksize = blocksize * rate // self.sample_rate
+                # The callback stores what the device sends untouched. The consumer resamples after reading
+                frame = channels * SAMPLE_WIDTH
+                self.audio_buffer = AudioRingBuffer(rate * frame * BUFFER_SECONDS, frame)
+                self.capture_rate = rate * frame
+                self.capture_block = self.block_size * rate // self.sample_rate * frame
+        self.logger.info(f'Opening input device {device} at {rate} Hz, {channels} channel(s) with {blocksize} frame blocks')
+        self.audio_stream = sd.RawInputStream(
+            samplerate=rate,
+            blocksize=blocksize,
+            device=device,
+            dtype='int16',
+            channels=channels,
+            callback=self.voice_callback
+        )
+        self.audio_stream.start()
+        
+    async def start_listener(self):
+        # A secondary microphone that fails to open is logged and skipped, the others keep listening
+        self.isRunning = True
+        self.stopping = False
+        self.loop = asyncio.get_running_loop()
+        try:
+            if self.recognizer is None:
+                self.phrases = self.parent.phrases
+                await self.loop.run_in_executor(self.executor, self.load_model)
+            self.open_stream()
+        except Exception as e:
+            self.logger.error(f'Could not open input device {self.device}: {e}')
+            self.isRunning = False
+            return
+        await self.process_audio()
         
     async def start(self):
         self.logger.info('Starting voice recognition')
         self.isRunning = True
-        default_input = sd.default.device[0]
+        self.stopping = False
+        self.loop = asyncio.get_running_loop()
         
         try:
-            await self.obs_controller.connect()
+            if self.recognizer is None:
+                await self.loop.run_in_executor(self.executor, self.load_model)
             
-            self.audio_stream = sd.RawInputStream(
-                samplerate=16000,
-                blocksize=8000,
-                device=default_input,
-                dtype='int16',
-                channels=1,
-                callback=self.voice_callback
-            )
-            self.audio_stream.start()
+            # OBS comes up in the background and is kept warm, so a missing OBS never blocks audio
+            self.obs_controller.start_supervisor()
+            self.command_watcher = asyncio.create_task(self.watch_commands())
+            if self.metrics_log_interval:
+                self.metrics_reporter = asyncio.create_task(self.report_metrics())
+            
+            self.open_stream()
+            # Each microphone decodes on its own thread, so devices run in parallel across cores
+            self.listener_tasks = [asyncio.create_task(listener.start_listener()) for listener in self.listeners]
+            self.ready.emit()
             await self.process_audio()
+            await asyncio.gather(*self.listener_tasks)
         except Exception as e: 
             self.logger.error(f'Could not start audio steam: {e}')
             self.isRunning = False
             raise
     
+    def close_stream(self):
+        if self.audio_stream and self.audio_stream.active:
+            self.logger.info(f'Closing audio stream for device {self.device}')
+            self.audio_stream.close()
+            self.audio_stream = None
+    
     async def stop(self):
         self.logger.info('Closing voice recognition')
 
-        self.logger.info('Putting sentinel into the queue')
-        self.queue.put(None)
+        self.isRunning = False
+        self.logger.info('Waking audio consumer')
+        self.wake()
         
-        if self.audio_stream.active:
-            self.logger.info('Closing audio stream')
-            self.audio_stream.close()
-            self.audio_stream = None
+        # Everything synchronous happens before the first await, so the teardown is complete even if the loop
+        # gets no further than this
+        self.close_stream()
+        for listener in self.listeners:
+            listener.isRunning = False
+            listener.close_stream()
+            listener.executor.shutdown(wait=False, cancel_futures=True)
+        if self.command_watcher:
+            self.command_watcher.cancel()
+            self.command_watcher = None
+        if self.metrics_reporter:
+            self.metrics_reporter.cancel()
+            self.metrics_reporter = None
+            metrics.log_summary()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.obs_controller.stop_supervisor()
+        
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(None, recognizer.close_recognizer) for recognizer in [self, *self.listeners]
+        ))
         try:
             await self.obs_controller.disconnect()
         except Exception as e:
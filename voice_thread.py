@@ -33,7 +33,7 @@ class VoiceRecognizerThread(QThread):
             task.result()
         except Exception as e:
             self.logger.error(f'Voice recognizer task failed: {e}')
-            self.error_occured.emit('Could not connect to OBS. Change connection parameters then try again.')
+            self.error_occured.emit('Voice recognition stopped. Check your microphone and settings then try again.')
             self.exec_loop.stop()
             return
                 
@@ -44,9 +44,32 @@ class VoiceRecognizerThread(QThread):
                 self.stop_task = self.exec_loop.create_task(self.voice_recognizer.stop())
             except Exception as e:
                 self.logger.error(f'Thread encountered an issue: {e}', exc_info=True)
-            finally:
-                self.exec_loop.call_soon_threadsafe(self.exec_loop.stop)    
+                self.exec_loop.call_soon_threadsafe(self.exec_loop.stop)
+                return
+            # stop() awaits the decoders closing and OBS disconnecting, so the loop has to outlive it
+            self.stop_task.add_done_callback(self.on_stopped)
+            
+    def on_stopped(self, task):
+        if not task.cancelled() and task.exception():
+            self.logger.error(f'Voice recognition did not stop cleanly: {task.exception()}')
+        self.exec_loop.stop()
+    
+    def reconnect_obs(self, host, port, password):
+        # Called from the GUI thread. The recognizer and its model keep running while OBS reconnects
+        controller = self.voice_recognizer.obs_controller
+        future = asyncio.run_coroutine_threadsafe(controller.reconnect(host, port, password), self.exec_loop)
+        future.add_done_callback(self.on_reconnect)
+        
+    def on_reconnect(self, future):
+        try:
+            future.result()
+        except Exception as e:
+            self.logger.error(f'OBS reconnect failed: {e}')
+            self.error_occured.emit('Could not connect to OBS. Change connection parameters then try again.')
     
     def req_stop(self):
         # Breaks guard clause in voice_recognizer to end task
-        self.voice_recognizer.isRunning = False
\ No newline at end of file
+        self.voice_recognizer.isRunning = False
+        # Wake the consumer right away instead of waiting for the next audio block
+        if self.exec_loop and self.exec_loop.is_running():
+            self.exec_loop.call_soon_threadsafe(self.voice_recognizer.wake)
\ No newline at end of file
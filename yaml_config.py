@@ -1,56 +1,219 @@
 import os
 import logging
+import tempfile
+import threading
 import yaml
 
 logger = logging.getLogger(__name__)
 
 FILE_NAME = 'config.yaml'
+COMMANDS_FILE_NAME = 'commands.yaml'
 DEFAULT_CONFIG = {
     'host': 'localhost',
     'port': 4455,
     'password': 'password',
     'notifications': 'TTS',
-    'startup': False
+    'startup': False,
+    'decoding': 'Open',
+    'decoder_backend': 'Thread',
+    'partial_results': False,
+    'device': '',
+    'devices': [],
+    'sample_rate': 16000,
+    'native_capture': True,
+    'block_size': 8000,
+    'speech_block_size': 1600,
+    'adaptive_blocks': False,
+    'vad': False,
+    'vad_threshold': 300,
+    'tts_tail_ms': 300,
+    'command_cooldown_ms': 1500,
+    'metrics_port': 0,
+    'metrics_log_interval': 300,
+    'log_format': 'text'
 }
 
+# A device is a name or an index, and YAML reads a bare index as an int
+DEVICE_TYPES = (str, int)
+
+def is_valid_value(key, value):
+    if key == 'device':
+        return type(value) in DEVICE_TYPES
+    if key == 'devices':
+        return type(value) is list and all(type(device) in DEVICE_TYPES for device in value)
+    return value != None and type(DEFAULT_CONFIG[key]) is type(value)
+
 def is_valid_config(config):
-    for key, value in DEFAULT_CONFIG.items():
-        if config.get(key) == None or not type(value) is type(config.get(key)):
+    if not isinstance(config, dict):
+        return False
+    for key in DEFAULT_CONFIG:
+        if not is_valid_value(key, config.get(key)):
             return False
               
     return True
 
+def fill_config(config):
+    # A missing or mistyped setting falls back to its default on its own, so a config written by an older
+    # version, or with one bad value, keeps everything else the user set. Returns the config and the keys replaced
+    filled = dict(config)
+    replaced = []
+    for key, value in DEFAULT_CONFIG.items():
+        if not is_valid_value(key, config.get(key)):
+            filled[key] = value
+            replaced.append(key)
+    return filled, replaced
+
+# Settings toggles within this window collapse into a single write
+SAVE_DEBOUNCE = 0.5
+
+# The parsed config lives here after the first load. It's only re-read when the file changes on disk
+_cache = {'config': None, 'stamp': None}
+_lock = threading.RLock()
+_pending_save = None
+
+def file_stamp():
+    try:
+        stat = os.stat(FILE_NAME)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
 def load_config():
     logger.info('Checking if config file exists...')
-    if os.path.exists(FILE_NAME):
-        logger.info('Config found')
-        
-        with open(FILE_NAME, 'r') as file:
-            config = yaml.safe_load(file)
+    # A debounced save still waiting to be written is newer than the file
+    flush_config()
+    with _lock:
+        if os.path.exists(FILE_NAME):
+            logger.info('Config found')
+            
+            with open(FILE_NAME, 'r') as file:
+                config = yaml.safe_load(file)
             if is_valid_config(config):
                 logger.info('Existing config valid')
+            elif isinstance(config, dict):
+                config, replaced = fill_config(config)
+                logger.warning(f'Existing config missing or invalid for {", ".join(replaced)}. Using the defaults for those...')
+                write_config(config)
             else:
                 logger.warning('Existing config invalid. Creating default config instead...')
-                config = DEFAULT_CONFIG
-                save_config(config)
-    else:
-        logger.info('Config does not exist. Generating...')
-        config = DEFAULT_CONFIG
-        save_config(config)
+                config = dict(DEFAULT_CONFIG)
+                write_config(config)
+        else:
+            logger.info('Config does not exist. Generating...')
+            config = dict(DEFAULT_CONFIG)
+            write_config(config)
+        
+        _cache['config'] = config
+        _cache['stamp'] = file_stamp()
             
     logger.info('Config loaded correctly')
     return config
 
+def write_config(config):
+    # Written to a temp file in the same directory then renamed, so a crash never leaves a half-written config
+    directory = os.path.dirname(os.path.abspath(FILE_NAME))
+    fd, temp_path = tempfile.mkstemp(prefix='.config-', suffix='.yaml', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as file:
+            yaml.dump(config, file, default_flow_style=False)
+        os.replace(temp_path, FILE_NAME)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    
+    with _lock:
+        if _cache['config'] is config:
+            _cache['stamp'] = file_stamp()
+
 def save_config(config, updates=None):
-    logger.info('Config saved')
+    global _pending_save
     if updates:
         for key, val in updates.items():
             config[key] = val
 
-    with open(FILE_NAME, 'w') as file:
-        yaml.dump(config, file, default_flow_style=False)
+    with _lock:
+        _cache['config'] = config
+        if _pending_save:
+            _pending_save.cancel()
+        _pending_save = threading.Timer(SAVE_DEBOUNCE, flush_config)
+        _pending_save.daemon = True
+        _pending_save.start()
+        
+def flush_config():
+    global _pending_save
+    with _lock:
+        if _pending_save:
+            _pending_save.cancel()
+            _pending_save = None
+            write_config(_cache['config'])
+            logger.info('Config saved')
         
 def get_config():
-    with open(FILE_NAME, 'r') as file:
-        config = yaml.safe_load(file)
-    return config
\ No newline at end of file
+    with _lock:
+        if _cache['config'] is None:
+            return load_config()
+        # Unsaved changes are newer than whatever is on disk
+        if _pending_save:
+            return _cache['config']
+        
+        stamp = file_stamp()
+        if stamp is None or stamp == _cache['stamp']:
+            return _cache['config']
+        
+        logger.info('Config changed on disk. Reloading...')
+        try:
+            with open(FILE_NAME, 'r') as file:
+                config = yaml.safe_load(file)
+        except (OSError, yaml.YAMLError) as e:
+            logger.error(f'Could not read {FILE_NAME}: {e}')
+            config = None
+        
+        _cache['stamp'] = stamp
+        if isinstance(config, dict):
+            config, replaced = fill_config(config)
+            if replaced:
+                logger.warning(f'Changed config missing or invalid for {", ".join(replaced)}. Using the defaults for those')
+            _cache['config'] = config
+        else:
+            logger.warning('Changed config invalid. Keeping the current settings')
+        return _cache['config']
+
+def is_valid_command(phrase, command):
+    if not isinstance(phrase, str) or not phrase.strip() or not isinstance(command, dict):
+        return False
+    if not isinstance(command.get('response', ''), str):
+        return False
+    
+    requests = command.get('requests')
+    if not isinstance(requests, list) or not requests:
+        return False
+    for request in requests:
+        if not isinstance(request, dict) or not isinstance(request.get('requestType'), str):
+            return False
+        if not isinstance(request.get('requestData', {}), dict):
+            return False
+    return True
+
+def load_commands():
+    # Returns None when the file can't be used so callers keep whatever they already have
+    if not os.path.exists(COMMANDS_FILE_NAME):
+        return {}
+    
+    try:
+        with open(COMMANDS_FILE_NAME, 'r') as file:
+            commands = yaml.safe_load(file) or {}
+    except yaml.YAMLError as e:
+        logger.error(f'Could not parse {COMMANDS_FILE_NAME}: {e}')
+        return None
+    
+    if not isinstance(commands, dict):
+        logger.error(f'{COMMANDS_FILE_NAME} must map phrases to commands')
+        return None
+    
+    valid = {}
+    for phrase, command in commands.items():
+        if is_valid_command(phrase, command):
+            valid[phrase.strip().lower()] = command
+        else:
+            logger.warning(f'Skipping invalid command for phrase {phrase!r}')
+    return valid